@@ -1,68 +1,439 @@
 import pydicom
 import os
+import sys
+import argparse
+import bisect
+import functools
+import gc
+import logging
+import logging.handlers
 import time
 import random
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from itertools import islice
+from pydicom.dataelem import DataElement, RawDataElement
+from pydicom.filebase import DicomBytesIO
+from pydicom.filewriter import write_data_element
+from pydicom.tag import Tag
 
-# 1. Inputs and Outputs
-input_folder = "2_skull_ct/DICOM" 
+# Stream PixelData across in 1 MB chunks instead of holding it all in memory
+CHUNK_SIZE = 1 << 20
+
+# Big elements that sit in the header (overlays, icon images, vendor blobs)
+# aren't read into memory until they're actually needed - at save time.  The
+# --fast-header path copies them across as raw bytes and never loads them.
+DEFER_SIZE = "1 KB"
+
+# Write the dataset back exactly as it was read (same transfer syntax, file
+# meta passed through untouched) rather than having pydicom rebuild and
+# re-check it.  pydicom 3 renamed write_like_original=True to
+# enforce_file_format=False.
+if int(pydicom.__version__.split(".")[0]) >= 3:
+    SAVE_LIKE_ORIGINAL = {"enforce_file_format": False}
+else:
+    SAVE_LIKE_ORIGINAL = {"write_like_original": True}
+
+# Printed between sections of the log
+SEPARATOR = "-" * 50
+
+# 1. Inputs and Outputs (defaults - both can be overridden on the command line)
+input_folder = "2_skull_ct/DICOM"
 output_folder = "batch_anonymized"
 
-# 2. Create output folder
-if not os.path.exists(output_folder):
-    os.makedirs(output_folder)
+# STOPPER: Only do 5 files for the demo (--limit 0 processes everything)
+DEMO_LIMIT = 5
+
+# Each worker process runs a full garbage collection every GC_EVERY files, so
+# any reference cycles left behind by pydicom get freed on a steady schedule
+# instead of piling up over a long run
+GC_EVERY = 32
+_files_in_this_worker = 0
+
+# Uploads run in the background while the next files are anonymized.
+# Cap how many can be queued up so a slow link can't build an endless backlog.
+UPLOAD_WORKERS = 4
+MAX_PENDING_UPLOADS = 8
+
+log = logging.getLogger("mdg")
 
-# 3. Get the list of files
-files = [f for f in os.listdir(input_folder) if not f.startswith('.')]
-print(f"Starting batch processing of {len(files)} files...")
-print("-" * 50)
+def setup_logging():
+    # Log lines instead of print(): print() flushes stdout on every line when
+    # it's a terminal, which adds up over a big batch.  The MemoryHandler
+    # holds lines back and writes them out in blocks of 64 (errors go out
+    # straight away, and anything left is flushed at exit).  Logging is
+    # also thread-safe, so lines from parallel uploads don't get mixed up.
+    # MDG_LOG=DEBUG shows the per-upload detail.
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter("%(message)s"))
+    buffered = logging.handlers.MemoryHandler(64, flushLevel=logging.ERROR, target=console)
+    logging.basicConfig(level=os.environ.get("MDG_LOG", "INFO"), handlers=[buffered])
 
 # --- THE DRAMA FUNCTION (Fake Upload) ---
-def mock_upload(filename):
-    print(f"   [UPLOAD] Sending {filename} to MedCloud...")
-    time.sleep(0.3) 
-    
+# (--no-simulate-latency skips all the sleeps, for benchmarking/CI runs where
+# the fake network wait would just hide the real costs)
+def mock_upload(filename, simulate_latency=True):
+    log.debug("   [UPLOAD] Sending %s to MedCloud...", filename)
+    if simulate_latency:
+        time.sleep(0.3)
+
     if random.random() < 0.3:
-        print(f"   [!] CONNECTION DROP: 4G Signal Unstable.")
-        time.sleep(0.5)
-        print(f"   [RETRY] Exponential Backoff... Retrying in 1s...")
-        time.sleep(1.0)
-        print(f"   [SUCCESS] Reconnected via HTTPS. Upload Complete.")
+        log.info("   [!] CONNECTION DROP: 4G Signal Unstable (%s).", filename)
+        if simulate_latency:
+            time.sleep(0.5)
+        log.debug("   [RETRY] Exponential Backoff... Retrying in 1s...")
+        if simulate_latency:
+            time.sleep(1.0)
+        log.info("   [SUCCESS] Reconnected via HTTPS. Upload Complete: %s", filename)
     else:
-        print(f"   [SUCCESS] Upload Complete.")
-
-# 4. The Loop
-for index, filename in enumerate(files):
-    # STOPPER: Only do 5 files for the demo
-    if index >= 5:
-        print("\n[DEMO LIMIT] Processed 5 files. Stopping batch job.")
-        break
-
-    # --- THIS WAS THE MISSING LINE CAUSING THE ERROR ---
-    full_path = os.path.join(input_folder, filename)
-    # ---------------------------------------------------
-    
+        log.info("   [SUCCESS] Upload Complete: %s", filename)
+    log.debug(SEPARATOR)
+
+# --- THE FILE FINDER ---
+def is_dicom_magic(path):
+    """True if *path* has the 128-byte preamble followed by b"DICM"."""
+    with open(path, "rb") as fp:
+        return fp.read(132)[128:] == b"DICM"
+
+def iter_dicoms(folder):
+    """Lazily yield (name, full path) for every DICOM file in *folder*."""
+    # scandir hands back DirEntry objects that already know their full path
+    # and file type, so there's no extra stat() or os.path.join per file.
+    # Junk (notes, thumbnails, DICOMDIR xml...) is weeded out here: a .dcm
+    # name is trusted as-is, anything else costs one 132-byte read - much
+    # cheaper than letting pydicom get partway through it and fail.
+    with os.scandir(folder) as it:
+        for entry in it:
+            if entry.name.startswith('.') or not entry.is_file():
+                continue
+            if entry.name.endswith(".dcm") or is_dicom_magic(entry.path):
+                yield entry.name, entry.path
+            else:
+                log.debug("[SKIP] %s: not a DICOM file", entry.name)
+
+def iter_manifest(manifest):
+    """Lazily yield (name, full path) for each path listed in *manifest*.
+
+    One path per line; "-" reads the list from stdin.
+    """
+    fp = sys.stdin if manifest == "-" else open(manifest)
     try:
-        # A. Read
-        ds = pydicom.dcmread(full_path)
-        
-        # B. Modify 
-        ds.PatientName = "ANONYMOUS"
-        ds.PatientID = "00000"
-        # The Critical Tag
-        ds.StationName = "REMOTE_MOBILE_CLINIC_01" 
-        
-        # C. Save
-        new_filename = f"Clean_{filename}"
-        save_path = os.path.join(output_folder, new_filename)
-        ds.save_as(save_path)
-        
-        print(f"[EDGE PROCESS] Anonymized: {filename}")
-        
-        # D. Run the Fake Upload
-        mock_upload(new_filename)
-        print("-" * 50)
+        for line in fp:
+            path = line.strip()
+            if path:
+                yield os.path.basename(path), path
+    finally:
+        if fp is not sys.stdin:
+            fp.close()
+
+# --- THE ANONYMIZATION (works on an already-loaded dataset, in place) ---
+# The replacement values never change, so spell them out once as
+# (tag, VR, value).  Setting ds.PatientName = "..." looks up the keyword, the
+# tag and the VR on every single file; building the element straight from
+# this table skips all of that.  The tags are resolved to Tag objects up
+# front too, so indexing a dataset with them doesn't have to convert an
+# int/tuple into a Tag every time.  (Each dataset gets its own new elements
+# - sharing one mutable DataElement between datasets would let an edit to
+# one file's copy leak into every other.)
+_REPLACEMENTS = (
+    (Tag(0x0010, 0x0010), "PN", "ANONYMOUS"),  # PatientName
+    (Tag(0x0010, 0x0020), "LO", "00000"),  # PatientID
+    (Tag(0x0008, 0x1010), "SH", "REMOTE_MOBILE_CLINIC_01"),  # StationName - the Critical Tag
+)
+
+def anonymize_dataset(ds):
+    # Swap whole elements rather than doing ds[tag].value = ...: reading
+    # ds[tag] would first decode the old (raw) value just to throw it away.
+    for tag, vr, value in _REPLACEMENTS:
+        ds[tag] = DataElement(tag, vr, value)
+    return ds
+
+def is_already_clean(ds):
+    """True if the header already carries all three anonymized values."""
+    for tag, _, value in _REPLACEMENTS:
+        if tag not in ds or str(ds[tag].value) != value:
+            return False
+    return True
+
+def copy_rest(src, dst):
+    """Copy everything from *src*'s current position to the end into *dst*."""
+    # On Linux copy_file_range() moves the bytes inside the kernel - they
+    # never come up into Python at all.  Fall back to a normal chunked copy
+    # where it isn't available (macOS/Windows, some filesystems).
+    if hasattr(os, "copy_file_range"):
+        dst.flush()
+        offset = src.tell()
+        try:
+            while True:
+                copied = os.copy_file_range(src.fileno(), dst.fileno(), CHUNK_SIZE, offset)
+                if copied == 0:
+                    return
+                offset += copied
+        except OSError:
+            src.seek(offset)
+    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+# --- THE FAST PATH (--fast-header): patch bytes instead of re-serialising ---
+# Every file gets the same three replacement elements, so encode them to raw
+# bytes once (per transfer syntax) and splice those bytes into each file in
+# place of the old elements.  Everything else - the rest of the header and
+# the pixels - is copied across byte-for-byte, without pydicom ever
+# re-encoding it.
+
+# Explicit VR elements with these VRs have a 12-byte header, the rest 8
+_LONG_VRS = {"OB", "OD", "OF", "OL", "OV", "OW", "SQ", "SV", "UC", "UN", "UR", "UT", "UV"}
+_encoded_replacements = {}
+
+def encoded_replacements(implicit_vr, little_endian):
+    """[(tag, raw bytes), ...] for the three replacement elements, in tag order."""
+    key = (implicit_vr, little_endian)
+    if key not in _encoded_replacements:
+        encoded = []
+        for tag, vr, value in sorted(_REPLACEMENTS):
+            fp = DicomBytesIO()
+            fp.is_implicit_VR = implicit_vr
+            fp.is_little_endian = little_endian
+            write_data_element(fp, DataElement(tag, vr, value))
+            encoded.append((tag, fp.getvalue()))
+        _encoded_replacements[key] = encoded
+    return _encoded_replacements[key]
+
+def element_start(raw, implicit_vr):
+    """File offset of the first byte (the tag) of a raw element."""
+    if implicit_vr or raw.VR not in _LONG_VRS:
+        return raw.value_tell - 8
+    return raw.value_tell - 12
+
+def plan_splices(ds, pixel_offset):
+    """Work out [(start, end, new bytes), ...] for the byte-level rewrite.
+
+    The bytes from start to end in the source get replaced by the new bytes
+    (start == end means a plain insert).  Returns None if the file can't be
+    patched this way - the caller should then use the normal save path.
+    Must run before any of the elements are accessed, while they still
+    remember where in the file they came from.
+    """
+    ts = ds.file_meta.TransferSyntaxUID
+    if ts.is_deflated:
+        return None
+
+    tags = sorted(ds.keys())
+    plan = []
+    for tag, data in encoded_replacements(ts.is_implicit_VR, ts.is_little_endian):
+        if tag in ds:
+            raw = ds.get_item(tag)
+            if not isinstance(raw, RawDataElement):
+                return None
+            start = element_start(raw, ts.is_implicit_VR)
+            end = raw.value_tell + raw.length
+        else:
+            # Missing - insert it just before the next element along
+            later = bisect.bisect(tags, tag)
+            if later == len(tags):
+                start = pixel_offset
+            else:
+                raw = ds.get_item(tags[later])
+                if not isinstance(raw, RawDataElement):
+                    return None
+                start = element_start(raw, ts.is_implicit_VR)
+            end = start
+        plan.append((start, end, data))
+    return plan
+
+def write_spliced(src, dst, plan):
+    """Copy *src* into *dst*, applying the byte ranges from plan_splices()."""
+    pos = 0
+    src.seek(0)
+    for start, end, data in plan:
+        dst.write(src.read(start - pos))
+        dst.write(data)
+        src.seek(end)
+        pos = end
+    copy_rest(src, dst)
+
+def is_up_to_date(full_path, save_path):
+    """True if *save_path* was written after *full_path* last changed.
+
+    Only complete outputs ever exist at *save_path* (see write_atomically),
+    so a newer mtime can be trusted.
+    """
+    try:
+        return os.stat(save_path).st_mtime >= os.stat(full_path).st_mtime
+    except FileNotFoundError:
+        return False
+
+def write_atomically(save_path, write):
+    """Call write(fp) on a temp file next to *save_path*, then move it into place.
+
+    A crash or exception partway through leaves no truncated Clean_* file
+    behind - one would be newer than its source, so every later run would
+    skip it as up-to-date.  The temp file is a dot-file, which iter_dicoms
+    ignores, in case a hard kill leaves one lying around.
+    """
+    with tempfile.NamedTemporaryFile(
+        dir=os.path.dirname(os.path.abspath(save_path)), prefix=".", suffix=".tmp",
+        delete=False, buffering=CHUNK_SIZE,
+    ) as tmp:
+        try:
+            write(tmp)
+        except BaseException:
+            tmp.close()
+            os.unlink(tmp.name)
+            raise
+    os.replace(tmp.name, save_path)
+
+# --- THE WORKER (runs in a separate process, one file at a time) ---
+def process_one(full_path, save_path, fast_header=False):
+    """Anonymize one file. Returns (filename, status, error message).
+
+    status is "anonymized", "up-to-date" (a rerun - the output is newer
+    than the input), "copied" (already clean, copied as-is) or "error".
+    With *fast_header* the new tags are spliced in at byte level (see
+    plan_splices) instead of pydicom re-writing the whole header.
+    """
+    global _files_in_this_worker
+    filename = os.path.basename(full_path)
+    try:
+        # Reruns: if the output is newer than the input there's nothing to do,
+        # and two stat() calls are much cheaper than even a header read
+        if is_up_to_date(full_path, save_path):
+            return filename, "up-to-date", ""
+
+        # A. Read - header only. We only touch three header tags, so there is
+        # no point parsing the (huge) PixelData element.  stop_before_pixels
+        # leaves the file positioned at the start of PixelData.
+        # (No specific_tags here: the whole header has to be written back.)
+        with open(full_path, "rb", buffering=CHUNK_SIZE) as src:
+            ds = pydicom.dcmread(src, stop_before_pixels=True, defer_size=DEFER_SIZE)
+            if ds.file_meta.TransferSyntaxUID == pydicom.uid.DeflatedExplicitVRLittleEndian:
+                # Deflated bodies can't be byte-copied, so read the whole file
+                # (this leaves src at EOF, so nothing extra is copied below)
+                src.seek(0)
+                ds = pydicom.dcmread(src)
+
+            # (The splice plan has to be worked out before anything below
+            # touches the elements)
+            plan = plan_splices(ds, src.tell()) if fast_header else None
+
+            # B. Modify - unless the header is already clean, in which case
+            # the output is byte-for-byte the input: let the OS copy it
+            if is_already_clean(ds):
+                src.seek(0)
+                write_atomically(save_path, lambda dst: copy_rest(src, dst))
+                return filename, "copied", ""
+            anonymize_dataset(ds)
+
+            # C. Save - write the new header, then copy the untouched pixel
+            # bytes straight from the source file (same transfer syntax as the
+            # original)
+            def write(dst):
+                if plan is not None:
+                    write_spliced(src, dst, plan)
+                else:
+                    ds.save_as(dst, **SAVE_LIKE_ORIGINAL)
+                    copy_rest(src, dst)
+            write_atomically(save_path, write)
+            # Done with the dataset - drop it now rather than whenever the
+            # worker gets round to the next file
+            del ds
+        return filename, "anonymized", ""
 
     except Exception as e:
-        print(f"Error Processing {filename}: {e}")
+        return filename, "error", str(e)
+
+    finally:
+        _files_in_this_worker += 1
+        if _files_in_this_worker % GC_EVERY == 0:
+            gc.collect()
+
+def parse_args(argv=None):
+    # One long-lived process handles the whole batch, so the interpreter and
+    # pydicom import cost is paid once - not once per file.  To feed it an
+    # arbitrary list of files:
+    #   find /scans -name '*.dcm' | python batch_processor.py --manifest - --limit 0
+    parser = argparse.ArgumentParser(description="Anonymize a batch of DICOM files.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--input", default=input_folder,
+                        help="folder of DICOM files (default: %(default)s)")
+    source.add_argument("--manifest",
+                        help="file listing one DICOM path per line, or - for stdin")
+    parser.add_argument("--output", default=output_folder,
+                        help="where to write Clean_* files (default: %(default)s)")
+    parser.add_argument("--limit", type=int, default=DEMO_LIMIT,
+                        help="stop after this many files, 0 = no limit (default: %(default)s)")
+    parser.add_argument("--simulate-latency", action=argparse.BooleanOptionalAction, default=True,
+                        help="sleep in the fake upload like a real 4G link would (default: on)")
+    parser.add_argument("--fast-header", action="store_true",
+                        help="patch the three tags in at byte level instead of "
+                             "re-writing each header with pydicom")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging()
+
+    # 2. Create output folder
+    os.makedirs(args.output, exist_ok=True)
+
+    # 3. Get the files - read lazily, and we stop reading as soon as the
+    # limit is reached
+    limit = args.limit or None
+    if limit:
+        log.info("Starting batch processing (limit: %d files)...", limit)
+    else:
+        log.info("Starting batch processing...")
+    log.info(SEPARATOR)
+
+    if args.manifest:
+        inputs = iter_manifest(args.manifest)
+    else:
+        inputs = iter_dicoms(args.input)
+
+    srcs, dsts = [], []
+    for name, path in islice(inputs, limit):
+        srcs.append(path)
+        dsts.append(os.path.join(args.output, f"Clean_{name}"))
+
+    # 4. The Loop - every file is independent, so anonymize them in parallel
+    # (processes, not threads: pydicom parsing holds the GIL).  map() hands
+    # results back in input order.
+    #
+    # Uploads are just waiting on the network, so threads are enough.  The
+    # semaphore blocks here once MAX_PENDING_UPLOADS are queued.
+    upload_slots = threading.BoundedSemaphore(MAX_PENDING_UPLOADS)
+    uploads = []
+    done = 0
+
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex, \
+            ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as upload_pool:
+        worker = functools.partial(process_one, fast_header=args.fast_header)
+        for filename, status, error in ex.map(worker, srcs, dsts, chunksize=8):
+            if status == "error":
+                log.error("Error Processing %s: %s", filename, error)
+                continue
+            if status == "up-to-date":
+                log.info("[SKIP] %s: %s", filename, status)
+                continue
+
+            if status == "copied":
+                log.info("[EDGE PROCESS] Already clean, copied: %s", filename)
+            else:
+                log.info("[EDGE PROCESS] Anonymized: %s", filename)
+            done += 1
+
+            # D. Run the Fake Upload - in the background, so we can carry on
+            # with the next file while this one is "on the network"
+            upload_slots.acquire()
+            fut = upload_pool.submit(mock_upload, f"Clean_{filename}", args.simulate_latency)
+            fut.add_done_callback(lambda _: upload_slots.release())
+            uploads.append(fut)
+
+        # Drain whatever is still uploading
+        wait(uploads)
+
+    log.info("Batch Job completed: %d files anonymized.", done)
 
-print("Batch Job completed.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
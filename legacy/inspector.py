@@ -1,8 +1,20 @@
+import sys
 import pydicom
 import matplotlib.pyplot as plt
 
+# Pass --no-show to just print the metadata without opening the image
+show_image = "--no-show" not in sys.argv[1:]
+
 # 1. Load the mysterious file
-dataset = pydicom.dcmread("test_scan.dcm")
+# Pixel data is most of the file, so only parse it when we're going to show
+# it.  A metadata-only read also only needs the three tags we print - this
+# (stop_before_pixels + specific_tags) is the pattern to use for any script
+# that just looks at header values.
+if show_image:
+    dataset = pydicom.dcmread("test_scan.dcm")
+else:
+    dataset = pydicom.dcmread("test_scan.dcm", stop_before_pixels=True,
+                              specific_tags=["PatientID", "Modality", "StudyDate"])
 
 # 2. Print the hidden "Envelope" text (The Metadata)
 print("Patient ID:", dataset.PatientID)
@@ -10,5 +22,6 @@ print("Modality:", dataset.Modality)
 print("Study Date:", dataset.StudyDate)
 
 # 3. Show the image (The Pixel Data)
-plt.imshow(dataset.pixel_array, cmap=plt.cm.bone)
-plt.show()
\ No newline at end of file
+if show_image:
+    plt.imshow(dataset.pixel_array, cmap=plt.cm.bone)
+    plt.show()
@@ -1,21 +1,168 @@
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 import pydicom
 import numpy as np
+import matplotlib
+# No X display on Linux (CI, SSH, Docker) means no window to open anyway -
+# pick Agg before pyplot loads so it doesn't pull in a GUI toolkit for
+# nothing.  An explicit MPLBACKEND always wins.
+if sys.platform.startswith("linux") and not os.environ.get("DISPLAY") \
+        and not os.environ.get("WAYLAND_DISPLAY") and not os.environ.get("MPLBACKEND"):
+    matplotlib.use("Agg")
 import matplotlib.pyplot as plt
-from sklearn.cluster import KMeans
+from matplotlib.colors import ListedColormap
+from matplotlib.lines import Line2D
+from scipy.cluster.vq import kmeans2
+
+# Numba is optional: with it, the three per-scan statistics come out of one
+# compiled sweep over the pixels; without it we use plain NumPy reductions
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
 # --- CONFIGURATION ---
 # This must match the folder created by batch_processor.py
 input_folder = "batch_anonymized"
 
+# Features from earlier runs, keyed by (file path, mtime, size). Only new or
+# changed scans get re-read; delete the file to force a full rebuild.
+# (Size is in the key because a copy that preserves mtime - cp -p, rsync -t -
+# can still swap in different contents.)
+feature_cache_file = "miner_cache.npz"
+
+# Every file name is drawn next to its point up to this many scans; past that
+# each label is its own Text artist and they just pile on top of each other,
+# so only the few scans furthest from their cluster centre get one
+max_labelled_points = 50
+labelled_outliers = 5
+
+# Multi-frame volumes (hundreds of slices) get their mean/std from an evenly
+# strided sample of about this many pixels - well within 1% of the full
+# numbers.  The peak is always taken over every pixel, since a sample can
+# step right over the brightest one.
+sample_pixels = 500_000
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def mean_std_max(a):
+        """Mean, standard deviation and max of a 1-D array in a single pass."""
+        n = a.size
+        s = 0.0
+        s2 = 0.0
+        m = float(a[0])
+        for i in range(n):
+            v = float(a[i])
+            s += v
+            s2 += v * v
+            if v > m:
+                m = v
+        mean = s / n
+        var = max(s2 / n - mean * mean, 0.0)
+        return mean, np.sqrt(var), m
+else:
+    def mean_std_max(a):
+        """Mean, standard deviation and max of a 1-D array (NumPy fallback)."""
+        # np.std re-derives the mean in a pass of its own; taking the sum and
+        # the sum of squares (one BLAS dot) off a single float64 copy instead
+        # runs about twice as fast as np.mean + np.std
+        f = a.astype(np.float64)
+        n = f.size
+        mean = f.sum() / n
+        var = max(np.dot(f, f) / n - mean * mean, 0.0)
+        return mean, np.sqrt(var), a.max()
+
+def stored_pixels(ds):
+    """
+    The stored pixel values as a flat array.
+    For uncompressed little-endian data this is a zero-copy view of the
+    PixelData bytes, skipping pixel_array's decode/reshape machinery (we only
+    need mean/std/max, not the 2-D image).  Anything that needs real decoding
+    (compressed, big-endian, or BitsStored short of BitsAllocated, where the
+    unused high bits must be masked or sign-extended) goes through pixel_array
+    as before.  Like pixel_array, no rescale slope/intercept is applied.
+    """
+    file_meta = getattr(ds, "file_meta", None)
+    syntax = file_meta.get("TransferSyntaxUID") if file_meta is not None else None
+    bits = ds.get("BitsAllocated")
+    signed = ds.get("PixelRepresentation", 0) == 1
+    if (syntax is None or syntax.is_compressed or not syntax.is_little_endian
+            or bits not in (8, 16)
+            or ds.get("BitsStored", bits) != bits):
+        return ds.pixel_array.ravel()
+
+    dtype = {8: "u1", 16: "<u2"}[bits]
+    if signed:
+        dtype = dtype.replace("u", "i")
+    count = (ds.Rows * ds.Columns * ds.get("SamplesPerPixel", 1)
+             * int(ds.get("NumberOfFrames", 1) or 1))
+    return np.frombuffer(ds.PixelData, dtype=dtype, count=count)
+
+def load_feature_cache(path):
+    """
+    {(file path, mtime_ns, size): (density, contrast, peak)} saved by a
+    previous run, or {} if there is no usable cache (including one written
+    before sizes were recorded).
+    """
+    try:
+        with np.load(path) as cache:
+            return {(str(p), int(m), int(n)): tuple(f) for p, m, n, f in
+                    zip(cache["paths"], cache["mtimes"], cache["sizes"], cache["features"])}
+    except (OSError, KeyError, ValueError):
+        return {}
+
+def save_feature_cache(path, cache):
+    """Write the cache as plain arrays (no pickle), replacing it atomically."""
+    keys = list(cache)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as fh:
+        np.savez(fh,
+                 paths=np.array([k[0] for k in keys], dtype=str),
+                 mtimes=np.array([k[1] for k in keys], dtype=np.int64),
+                 sizes=np.array([k[2] for k in keys], dtype=np.int64),
+                 features=np.array([cache[k] for k in keys], dtype=np.float32).reshape(-1, 3))
+    os.replace(tmp_path, path)
+
+def mine_scan(path):
+    """
+    Read one scan and turn it into its three features.
+    Runs in a worker process, so errors come back as a message instead of
+    being raised (an exception would end the whole pool.map).
+    """
+    try:
+        # force=True helps read files even if headers are incomplete
+        ds = pydicom.dcmread(path, force=True)
+        pixel_data = stored_pixels(ds)
+        
+        # --- THE MINING LOGIC (Extracting "Meta-Features") ---
+        # We turn the image into Numbers (Features)
+        
+        # Feature 1: Average Density (How "bright" is the scan?)
+        # Feature 2: Contrast (Standard Deviation)
+        # High # = Sharp scan (Good). Low # = Blurry/Foggy scan (Bad).
+        # Feature 3: Peak Bone Density (Max Value)
+        # Reduced here, per scan, in the worker - not by stacking every
+        # slice into one (N, H, W) array first.  The stack would hold the
+        # whole folder in memory, need every scan to be the same size, and
+        # pull the reductions back into a single process, all to save a few
+        # microseconds of call overhead per slice.
+        if pixel_data.size > 2 * sample_pixels:
+            # Odd step: coprime with the (power-of-two) row width, so the
+            # sample walks across every column instead of one stripe
+            step = (pixel_data.size // sample_pixels) | 1
+            sample = pixel_data[::step]
+            avg_density, contrast, _ = mean_std_max(sample)
+            return (avg_density, contrast, pixel_data.max()), None
+        return mean_std_max(pixel_data), None
+    except Exception as e:
+        return None, str(e)
+
 def extract_scan_features(folder):
     """
     Loops through all patients to build the 'University Dataset'.
     Instead of just looking at one image, we compare ALL of them.
     """
-    data_points = []
-    filenames = []
-    
     # Safety Check
     if not os.path.exists(folder):
         print(f"ERROR: Folder '{folder}' not found. Run batch_processor.py first!")
@@ -23,43 +170,63 @@ def extract_scan_features(folder):
 
     print(f"--- 1. MINING DATASET GENERATION ---")
     
-    # Get all DICOM files
-    files = [f for f in os.listdir(folder) if not f.startswith('.')]
+    # Get all DICOM files - scandir entries carry their full path and file
+    # type, so there's no re-join or extra stat per file
+    with os.scandir(folder) as it:
+        files = [e for e in it if not e.name.startswith('.') and e.is_file()]
     
     if len(files) == 0:
         print("ERROR: No files in folder. Run the batch processor!")
         return [], []
 
-    for f in files:
-        full_path = os.path.join(folder, f)
-        try:
-            # force=True helps read files even if headers are incomplete
-            ds = pydicom.dcmread(full_path, force=True)
-            pixel_data = ds.pixel_array
-            
-            # --- THE MINING LOGIC (Extracting "Meta-Features") ---
-            # We turn the image into Numbers (Features)
-            
-            # Feature 1: Average Density (How "bright" is the scan?)
-            avg_density = np.mean(pixel_data)
-            
-            # Feature 2: Contrast (Standard Deviation)
-            # High # = Sharp scan (Good). Low # = Blurry/Foggy scan (Bad).
-            contrast = np.std(pixel_data)
-            
-            # Feature 3: Peak Bone Density (Max Value)
-            peak_bone = np.max(pixel_data)
-            
-            # Add to our "Excel Sheet"
-            data_points.append([avg_density, contrast, peak_bone])
-            filenames.append(f)
-            
-            print(f"   [MINED] {f} -> Density: {avg_density:.1f} | Contrast: {contrast:.1f}")
-            
-        except Exception as e:
-            print(f"   [SKIP] Could not read {f}: {e}")
-
-    return np.array(data_points), filenames
+    # Our "Excel Sheet": one row per scan, filled in place rather than built
+    # as a list of lists and copied into an array at the end
+    data_points = np.empty((len(files), 3), dtype=np.float32)
+    filenames = [None] * len(files)
+    write_idx = 0
+
+    cache = load_feature_cache(feature_cache_file)
+    fresh_cache = {}
+    stats = [entry.stat() for entry in files]
+    keys = [(entry.path, st.st_mtime_ns, st.st_size) for entry, st in zip(files, stats)]
+    to_mine = [key[0] for key in keys if key not in cache]
+
+    # Decoding (JPEG Lossless for the sample data) is CPU-bound and holds the
+    # GIL, so the cache misses are spread over worker processes.  map() hands
+    # results back in submission order; with nothing to mine no worker is
+    # ever started.
+    chunksize = max(1, len(to_mine) // (4 * (os.cpu_count() or 1)))
+    # Per-file report lines are collected and written in one go after the
+    # loop, rather than formatted and pushed through print() one at a time
+    report = []
+    with ProcessPoolExecutor() as pool:
+        mined = pool.map(mine_scan, to_mine, chunksize=chunksize)
+        for entry, key in zip(files, keys):
+            f = entry.name
+            if key in cache:
+                features = cache[key]
+                tag = "CACHED"
+            else:
+                features, error = next(mined)
+                if features is None:
+                    report.append(f"   [SKIP] Could not read {f}: {error}")
+                    continue
+                tag = "MINED"
+
+            avg_density, contrast, peak_bone = features
+            report.append(f"   [{tag}] {f} -> Density: {avg_density:.1f} | Contrast: {contrast:.1f}")
+            data_points[write_idx], filenames[write_idx] = features, f
+            fresh_cache[key] = features
+            write_idx += 1
+
+    if report:
+        sys.stdout.write("\n".join(report) + "\n")
+
+    # Only this run's files are kept, so deleted/changed scans drop out
+    if fresh_cache != cache:
+        save_feature_cache(feature_cache_file, fresh_cache)
+
+    return data_points[:write_idx], filenames[:write_idx]
 
 def run_clustering_analysis(data, filenames):
     """
@@ -73,36 +240,57 @@ def run_clustering_analysis(data, filenames):
     print("\n--- 2. EXECUTING K-MEANS ALGORITHM ---")
     
     # We use Density (Col 0) and Contrast (Col 1) to group patients
-    X = data[:, 0:2] 
+    # (a column slice is strided; copy it once into a compact C-ordered
+    # block so every pass below runs over contiguous memory)
+    X = np.ascontiguousarray(data[:, 0:2])
     
     # K-Means groups patients into 2 "Clusters" 
     # (e.g., Cluster 0 = Normal Scans, Cluster 1 = Outliers)
-    kmeans = KMeans(n_clusters=2, random_state=42, n_init=10)
-    labels = kmeans.fit_predict(X)
+    # Density and contrast live on different scales, so z-score both columns
+    # first - otherwise whichever spans more raw units decides the clusters.
+    # (The plot below still uses the raw values.)
+    # Stays float32 like the feature matrix - kmeans2 clusters float32 as-is
+    std = X.std(axis=0)
+    Xn = (X - X.mean(axis=0)) / np.where(std > 0, std, 1.0).astype(X.dtype)
+
+    # SciPy's kmeans2 is a bare Lloyd loop: on a few hundred 2-D points it
+    # finishes before sklearn's KMeans is done validating its input, let
+    # alone running ten restarts.  k-means++ seeding makes one run enough.
+    centroids, labels = kmeans2(Xn, 2, minit='++', seed=42)
     
     print(f"   [SUCCESS] Classified {len(data)} patients into 2 groups.")
 
     # --- VISUALIZATION ---
     print("\n--- 3. VISUALIZING POPULATION TRENDS ---")
-    plt.figure(figsize=(10, 6))
-    
-    # Plot Group A (Blue)
-    plt.scatter(X[labels == 0, 0], X[labels == 0, 1], 
-                s=100, c='blue', label='Cluster A (Standard Scans)')
+    fig = plt.figure(figsize=(10, 6))
     
-    # Plot Group B (Red)
-    plt.scatter(X[labels == 1, 0], X[labels == 1, 1], 
-                s=100, c='red', label='Cluster B (Outliers/Mobile Units)')
+    # Group A (Blue) and Group B (Red) in one scatter: the label array picks
+    # the colour, so there's one PathCollection and no boolean-mask copies.
+    # rasterized: if the report is ever saved as PDF/SVG the markers go in
+    # as one bitmap instead of one vector path each (no change for PNG).
+    plt.scatter(X[:, 0], X[:, 1], s=100, c=labels,
+                cmap=ListedColormap(['blue', 'red']), vmin=0, vmax=1,
+                rasterized=True)
+    legend_handles = [
+        Line2D([], [], marker='o', linestyle='', markersize=10, color='blue',
+               label='Cluster A (Standard Scans)'),
+        Line2D([], [], marker='o', linestyle='', markersize=10, color='red',
+               label='Cluster B (Outliers/Mobile Units)'),
+    ]
 
     # Label specific points so we know which file is which
-    for i, txt in enumerate(filenames):
-        # Only label every other file to keep it clean
-        plt.annotate(txt, (X[i, 0], X[i, 1]), fontsize=9, alpha=0.8, xytext=(5, 5), textcoords='offset points')
+    if len(filenames) <= max_labelled_points:
+        to_label = range(len(filenames))
+    else:
+        spread = np.linalg.norm(Xn - centroids[labels], axis=1)
+        to_label = np.argsort(spread)[-labelled_outliers:]
+    for i in to_label:
+        plt.annotate(filenames[i], (X[i, 0], X[i, 1]), fontsize=9, alpha=0.8, xytext=(5, 5), textcoords='offset points')
 
     plt.title("MedSendX Data Mining: Patient Population Analysis")
     plt.xlabel("Average Tissue Density (Brightness)")
     plt.ylabel("Scan Contrast (Image Quality)")
-    plt.legend()
+    plt.legend(handles=legend_handles)
     plt.grid(True, linestyle='--', alpha=0.6)
     
     print("   [DISPLAY] Opening Analysis Plot...")
@@ -111,7 +299,10 @@ def run_clustering_analysis(data, filenames):
     plt.savefig("mining_report.png")
     print("   [SAVED] Plot saved to 'mining_report.png'")
     
-    plt.show()
+    # Agg can't open a window (and would warn), so only show on a GUI backend
+    if matplotlib.get_backend().lower() != "agg":
+        plt.show()
+    plt.close(fig)
 
 # --- MAIN RUNNER ---
 if __name__ == "__main__":
@@ -1,6 +1,9 @@
-import pydicom 
-import matplotlib.pyplot as plt
+import argparse
 import os
+import sys
+
+import pydicom
+import matplotlib
 
 # Lets have a look at our cleaned file
 folder_path = "batch_anonymized" #We are just checking if the batch processor actually worked
@@ -8,26 +11,68 @@ filename =  "Clean_I10.dcm"
 
 full_path = os.path.join(folder_path, filename)
 
-#Check if file exists
-if not os.path.exists(full_path):
-    print(f"ERROR: could not find {full_path} ")
-    print("Did you run the batch processor first?")
-    exit()
+# Images at least twice this size (in either direction) are thinned out
+# before plotting - a screen / 100 dpi PNG can't show that many pixels, and
+# imshow resampling a big matrix is the slow part of drawing it
+MAX_DISPLAY_SIZE = 800
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Check an anonymized DICOM file by eye.")
+    parser.add_argument("--out", metavar="PNG",
+                        help="save the slice to this PNG instead of opening a window - "
+                             "no GUI toolkit is loaded, so it works in CI / over SSH")
+    parser.add_argument("--metadata-only", action="store_true",
+                        help="just print the tags - don't decode or show the image")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    #Check if file exists
+    if not os.path.exists(full_path):
+        print(f"ERROR: could not find {full_path} ")
+        print("Did you run the batch processor first?")
+        return 1
+
+    # Read the DICOM file.  Checking the tags alone doesn't need the pixels,
+    # which are most of the file and (for JPEG / JPEG 2000 files) slow to
+    # decode, so that read stops at the header and keeps only what we print.
+    if args.metadata_only:
+        ds = pydicom.dcmread(full_path, stop_before_pixels=True,
+                             specific_tags=["PatientName", "PatientID", "Rows", "Columns"])
+    else:
+        ds = pydicom.dcmread(full_path)
+
+    #we are printing a secret ID tag, anonymized version
+    print(f"Patient Name: {ds.PatientName} ")
+    print(f"Patient ID: {ds.PatientID}")
+    print(f"Image size: {ds.Rows} x {ds.Columns} pixels")
+    if args.metadata_only:
+        return 0
 
-# Read the DICOM file
-ds = pydicom.dcmread(full_path)
+    # The backend has to be picked before pyplot is imported - that import is
+    # what starts up Tk/Qt, which we don't need just to write a PNG
+    if args.out:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
 
-#we are printing a secret ID tag, anonymized version
-print(f"Patient Name: {ds.PatientName} ")
-print(f"Patient ID: {ds.PatientID}")
-print(f"Image size: {ds.Rows} x {ds.Columns} pixels")
+    # Magic: Show the image
+    print("Displaying image...")
 
-# Magic: Show the image
-print("Displaying image...")
+    #CT scans are usually just grid of numbers, pixel_arrays access them
+    # Every stride-th row and column: a view, no copy, same aspect ratio
+    stride = max(1, max(ds.Rows, ds.Columns) // MAX_DISPLAY_SIZE)
+    pixels = ds.pixel_array[::stride, ::stride]
+    plt.imshow(pixels, cmap =plt.cm.bone) #Bone colormap for better visualization of ct scans
 
-#CT scans are usually just grid of numbers, pixel_arrays access them
-plt.imshow(ds.pixel_array, cmap =plt.cm.bone) #Bone colormap for better visualization of ct scans
+    plt.title(f"CT Slice: {ds.PatientName}")
+    plt.axis('off')  #Hiding the x and y axis for better visualization
+    if args.out:
+        plt.savefig(args.out, bbox_inches="tight", dpi=100)
+        print(f"Saved: {args.out}")
+    else:
+        plt.show()
+    return 0
 
-plt.title(f"CT Slice: {ds.PatientName}")
-plt.axis('off')  #Hiding the x and y axis for better visualization
-plt.show()             
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
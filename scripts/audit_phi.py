@@ -15,6 +15,8 @@ import logging
 import os
 import sys
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
 import pydicom
 
@@ -22,7 +24,7 @@ import pydicom
 _REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, _REPO_ROOT)
 
-from src.anonymizer import TAGS_TO_REMOVE, TAGS_TO_REPLACE  # noqa: E402
+from src.anonymizer import DEFER_SIZE, TAGS_TO_REMOVE, TAGS_TO_REPLACE  # noqa: E402
 from src.config import CONFIG  # noqa: E402
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)-8s %(message)s")
@@ -33,6 +35,40 @@ _KNOWN_DUMMY_VALUES = {
     "NAME^NONE", "NONE", "ANONYMOUS", "ANON", "NOID", "00000",
     "SN000000", "", "N/A",
 }
+_KNOWN_DUMMY_VALUES_UPPER = frozenset(v.upper() for v in _KNOWN_DUMMY_VALUES)
+
+_ALL_PHI_TAGS = TAGS_TO_REMOVE + list(TAGS_TO_REPLACE.keys())
+
+
+def _read_header_phi(
+    full_path: str,
+) -> tuple[Optional[dict[str, str]], int, Optional[Exception]]:
+    """
+    Read one file's header and pull out what the audit needs.
+
+    Returns
+    -------
+    tuple
+        ``(phi_values, private_tag_count, None)`` on success, where
+        *phi_values* maps each PHI tag present to its stripped value, or
+        ``(None, 0, exc)`` if the file could not be read.
+    """
+    try:
+        # Only header tags are audited, so large values (the pixel data,
+        # most of the file) are deferred and never read.  The whole file is
+        # still parsed so private groups after PixelData (e.g. vendor 7FE1)
+        # are counted; specific_tags isn't used for the same reason.
+        ds = pydicom.dcmread(full_path, force=True, defer_size=DEFER_SIZE)
+        phi_values = {}
+        for tag in _ALL_PHI_TAGS:
+            val = str(getattr(ds, tag, "")).strip()
+            if val:
+                phi_values[tag] = val
+        # keys() gives the tags without loading any deferred values
+        private_count = sum(1 for tag in ds.keys() if tag.is_private)
+        return phi_values, private_count, None
+    except Exception as exc:
+        return None, 0, exc
 
 
 def audit_folder(folder: str) -> dict:
@@ -54,31 +90,32 @@ def audit_folder(folder: str) -> dict:
         logger.warning("No files found in %s", folder)
         return {}
 
-    all_phi_tags = TAGS_TO_REMOVE + list(TAGS_TO_REPLACE.keys())
-    tag_values: dict[str, Counter] = {t: Counter() for t in all_phi_tags}
+    tag_values: dict[str, Counter] = {t: Counter() for t in _ALL_PHI_TAGS}
     private_tag_counts: list[int] = []
     total_files = 0
     failed_files: list[str] = []
 
-    for fname in files:
-        full_path = os.path.join(folder, fname)
-        try:
-            ds = pydicom.dcmread(full_path, force=True)
+    # Header reads are mostly file I/O, which releases the GIL, so read them
+    # on a thread pool; results are tallied here in the main thread, in file
+    # order, so no Counter is shared between threads.
+    paths = [os.path.join(folder, fname) for fname in files]
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = pool.map(_read_header_phi, paths)
+        for fname, (phi_values, private_count, exc) in zip(files, results):
+            if exc is not None:
+                failed_files.append(f"{fname}: {exc}")
+                continue
             total_files += 1
-            for tag in all_phi_tags:
-                val = str(getattr(ds, tag, "")).strip()
-                if val:
-                    tag_values[tag][val] += 1
-            private_tags = [elem for elem in ds if elem.tag.is_private]
-            private_tag_counts.append(len(private_tags))
-        except Exception as exc:
-            failed_files.append(f"{fname}: {exc}")
+            for tag, val in phi_values.items():
+                tag_values[tag][val] += 1
+            private_tag_counts.append(private_count)
 
     # Determine risk level
     real_phi_found = []
     for tag in TAGS_TO_REMOVE:
         for val in tag_values[tag]:
-            if val.upper() not in {v.upper() for v in _KNOWN_DUMMY_VALUES}:
+            if val.upper() not in _KNOWN_DUMMY_VALUES_UPPER:
                 real_phi_found.append((tag, val, tag_values[tag][val]))
 
     has_private = any(c > 0 for c in private_tag_counts)
@@ -113,7 +150,7 @@ def print_report(results: dict) -> None:
         values = results["tag_values"][tag]
         if values:
             for val, count in values.most_common():
-                is_dummy = val.upper() in {v.upper() for v in _KNOWN_DUMMY_VALUES}
+                is_dummy = val.upper() in _KNOWN_DUMMY_VALUES_UPPER
                 status = "✓ dummy" if is_dummy else "⚠ REAL PHI?"
                 print(f"  {tag}: \"{val}\" ({count} files) — {status}")
         else:
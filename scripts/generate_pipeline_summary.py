@@ -15,18 +15,22 @@ Usage
 
 import base64
 import glob
+import io
+import json
 import logging
 import os
 import sys
+from typing import Optional
 
 _REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, _REPO_ROOT)
 
 import pydicom
+from PIL import Image
 
 from src.config import CONFIG
 from src.clustering import cluster_scan
-from src.scanner_qc import run_qc
+from src.scanner_qc import ScanFeatures, run_qc
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)-8s %(message)s")
 logger = logging.getLogger(__name__)
@@ -34,15 +38,58 @@ logger = logging.getLogger(__name__)
 INPUT_FOLDER = os.path.join(_REPO_ROOT, CONFIG["paths"]["input_folder"])
 OUTPUT_FOLDER = os.path.join(_REPO_ROOT, CONFIG["paths"]["output_folder"])
 REPORTS_FOLDER = os.path.join(_REPO_ROOT, CONFIG["paths"]["reports_folder"])
+RESULTS_FILE = os.path.join(_REPO_ROOT, CONFIG["paths"]["results_file"])
+
+# Inline images are shrunk to fit this box.  GitHub caps a step summary at
+# 1 MiB and base64 adds a third on top, so full-size report PNGs would eat
+# most of that; the full-resolution files are in the pipeline-reports artifact.
+THUMBNAIL_SIZE = (640, 480)
 
 
 def _image_to_base64(path: str) -> str:
-    """Return a base64-encoded data URI for an image file."""
+    """Return a base64-encoded data URI for a thumbnail of an image file."""
     with open(path, "rb") as f:
-        data = base64.b64encode(f.read()).decode("ascii")
+        original = f.read()
+    with Image.open(io.BytesIO(original)) as img:
+        img.thumbnail(THUMBNAIL_SIZE)
+        buf = io.BytesIO()
+        # Resampling breaks up matplotlib's flat colour areas, so a resized
+        # RGBA PNG can come out *bigger* than the original; a 256-colour
+        # palette keeps it small.
+        img.convert("RGB").quantize(256).save(buf, "PNG", optimize=True)
+    # Keep whichever is smaller - small plots often already beat the thumbnail
+    png = min(original, buf.getvalue(), key=len)
+    data = base64.b64encode(png).decode("ascii")
     return f"data:image/png;base64,{data}"
 
 
+def _load_results() -> Optional[dict]:
+    """
+    Return the numbers saved by run_full_pipeline.py, or None if they are
+    missing, unreadable, or older than the data they describe.
+
+    Any file added, changed or removed in the input/output folders since
+    the pipeline ran makes the saved results stale, and the summary falls
+    back to recomputing them.
+    """
+    try:
+        saved_at = os.path.getmtime(RESULTS_FILE)
+        with open(RESULTS_FILE) as f:
+            results = json.load(f)
+        newest = 0.0
+        for folder in (INPUT_FOLDER, OUTPUT_FOLDER):
+            newest = max(newest, os.path.getmtime(folder))
+            with os.scandir(folder) as it:
+                for entry in it:
+                    newest = max(newest, entry.stat().st_mtime)
+    except (OSError, ValueError):
+        return None
+    if newest > saved_at:
+        logger.info("Saved pipeline results are stale — recomputing.")
+        return None
+    return results
+
+
 def _build_summary() -> str:
     """Build a Markdown summary of the pipeline run."""
     lines: list[str] = []
@@ -59,11 +106,17 @@ def _build_summary() -> str:
     lines.append(f"| Output files (data/processed) | {len(output_files)} |")
     lines.append("")
 
+    # Reuse the pipeline's own numbers when they're current, rather than
+    # reading and clustering every scan again
+    results = _load_results()
+
     # ── Clustering metrics ─────────────────────────────────────────────────
     lines.append("## 🔬 Intensity Clustering (K-Means, k=3)\n")
     if not input_files:
         lines.append("_No input files found — skipping clustering._\n")
         silhouette = float("nan")
+    elif results is not None:
+        silhouette = results["clustering"]["silhouette"]
     else:
         first_file = os.path.join(INPUT_FOLDER, input_files[0])
         ds = pydicom.dcmread(first_file)
@@ -85,7 +138,17 @@ def _build_summary() -> str:
 
     # ── Fleet QC metrics ───────────────────────────────────────────────────
     lines.append("## 🛡️ Fleet-Level Scanner QC (K-Means, k=2)\n")
-    records, _, labels, qc_sil = run_qc(OUTPUT_FOLDER, n_clusters=2)
+    if results is not None:
+        scans = results["qc"]["scans"]
+        labels = [scan.pop("label") for scan in scans]
+        records = [ScanFeatures(**scan) for scan in scans]
+        qc_sil = results["qc"]["silhouette"]
+    else:
+        records, _, labels, qc_sil = run_qc(
+            OUTPUT_FOLDER,
+            n_clusters=2,
+            silhouette_sample_size=CONFIG["clustering"]["silhouette_sample_size"],
+        )
 
     lines.append(f"| Metric | Value | Interpretation |")
     lines.append(f"|--------|-------|----------------|")
@@ -104,12 +167,17 @@ def _build_summary() -> str:
     lines.append("### Per-Scan Breakdown\n")
     lines.append("| File | Group | Avg Density | Contrast | Status |")
     lines.append("|------|-------|-------------|----------|--------|")
-    for rec, lbl in zip(records, labels):
-        status = "⚠️ Outlier?" if lbl != 0 else "✅ Normal"
-        lines.append(
-            f"| {rec.filename} | {lbl} | {rec.avg_density:.1f} "
-            f"| {rec.contrast:.1f} | {status} |"
-        )
+    # One bound str.format mapped over the columns - no per-row f-string
+    # parse or list.append call
+    row = "| {} | {} | {:.1f} | {:.1f} | {} |".format
+    lines.extend(map(
+        row,
+        [rec.filename for rec in records],
+        labels,
+        [rec.avg_density for rec in records],
+        [rec.contrast for rec in records],
+        ["⚠️ Outlier?" if lbl != 0 else "✅ Normal" for lbl in labels],
+    ))
     lines.append("")
 
     # ── Visualisations ─────────────────────────────────────────────────────
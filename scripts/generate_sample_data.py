@@ -17,11 +17,12 @@ Or open the demo notebook:
 
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 import pydicom
 from pydicom.dataset import FileDataset
-from pydicom.uid import ExplicitVRLittleEndian
+from pydicom.uid import CTImageStorage, ExplicitVRLittleEndian
 
 # Make sure repo root is on the path when run as a script
 _REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -53,35 +54,57 @@ _SCAN_PROFILES = [
 ]
 
 
-def _make_dicom(
-    path: str,
-    patient_name: str,
-    patient_id: str,
-    mean_val: float,
-    std_val: float,
-    size: int = 128,
-    seed: int = 42,
-) -> None:
+def _make_pixels(size: int = 128, seed: int = 42) -> np.ndarray:
     """
-    Write a single synthetic DICOM file.
+    Draw the pixel data for every profile in _SCAN_PROFILES at once.
+
+    Pixel values are drawn from a Normal distribution per profile, then a
+    bright square is added to simulate a bone / high-density region.  All
+    scans come from one (n_scans, size, size) draw, clipped and cast in a
+    single pass, rather than one generator and one draw per file.
 
-    Pixel values are drawn from a Normal distribution, then a bright square
-    is added to simulate a bone / high-density region.  RescaleSlope=1 and
-    RescaleIntercept=-1024 bring the stored integers into HU range.
+    Returns
+    -------
+    np.ndarray
+        uint16 array of shape (len(_SCAN_PROFILES), size, size).
     """
     rng = np.random.default_rng(seed)
+    means = np.array([p[1] for p in _SCAN_PROFILES], dtype=np.float32)
+    stds = np.array([p[2] for p in _SCAN_PROFILES], dtype=np.float32)
 
     # Generate realistic-looking pixel data
-    pixels = rng.normal(mean_val, std_val, size=(size, size))
-    pixels = pixels.clip(0, 4095).astype(np.uint16)
+    raw = rng.standard_normal((len(_SCAN_PROFILES), size, size), dtype=np.float32)
+    raw *= stds[:, None, None]
+    raw += means[:, None, None]
+    # Clip in place, then one cast: no float temporary the size of the batch
+    np.clip(raw, 0, 4095, out=raw)
+    pixels = raw.astype(np.uint16)
 
     # Add a bright square to simulate bone
     sq = size // 4
-    pixels[sq : sq * 2, sq : sq * 2] = min(int(mean_val * 1.8), 4095)
+    bright = np.minimum((means.astype(np.float64) * 1.8).astype(np.int64), 4095)
+    pixels[:, sq : sq * 2, sq : sq * 2] = bright[:, None, None]
+    return pixels
+
+
+def _make_dicom(
+    path: str,
+    patient_name: str,
+    patient_id: str,
+    pixels: np.ndarray,
+    sop_instance_uid: str,
+) -> None:
+    """
+    Write a single synthetic DICOM file holding *pixels* (2-D uint16).
+
+    RescaleSlope=1 and RescaleIntercept=-1024 bring the stored integers
+    into HU range.
+    """
+    size = pixels.shape[0]
 
     file_meta = pydicom.Dataset()
-    file_meta.MediaStorageSOPClassUID = pydicom.uid.UID("1.2.840.10008.5.1.4.1.1.2")
-    file_meta.MediaStorageSOPInstanceUID = pydicom.uid.generate_uid()
+    file_meta.MediaStorageSOPClassUID = CTImageStorage
+    file_meta.MediaStorageSOPInstanceUID = sop_instance_uid
     file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
 
     ds = FileDataset(path, {}, file_meta=file_meta, preamble=b"\0" * 128)
@@ -130,18 +153,26 @@ def generate(output_folder: str = OUTPUT_FOLDER) -> None:
     print(f"Writing {len(_SCAN_PROFILES)} synthetic DICOM files to: {output_folder}")
     print("-" * 60)
 
-    for i, (stem, mean_val, std_val, note) in enumerate(_SCAN_PROFILES, start=1):
-        filename = f"{stem}.dcm"
-        path = os.path.join(output_folder, filename)
-        _make_dicom(
-            path=path,
-            patient_name=f"Synthetic^Patient{i:02d}",
-            patient_id=f"{i:05d}",
-            mean_val=mean_val,
-            std_val=std_val,
-            seed=42 + i,
+    pixels = _make_pixels()
+    n = len(_SCAN_PROFILES)
+    filenames = [f"{stem}.dcm" for stem, *_ in _SCAN_PROFILES]
+    uids = [pydicom.uid.generate_uid() for _ in range(n)]
+
+    # The files are independent and writing them is mostly I/O, so they're
+    # saved on a thread pool.  map() hands results back in order, so the
+    # progress lines still print as 01..10.
+    with ThreadPoolExecutor() as pool:
+        written = pool.map(
+            _make_dicom,
+            [os.path.join(output_folder, f) for f in filenames],
+            [f"Synthetic^Patient{i:02d}" for i in range(1, n + 1)],
+            [f"{i:05d}" for i in range(1, n + 1)],
+            pixels,
+            uids,
         )
-        print(f"  [{i:02d}/{len(_SCAN_PROFILES)}] {filename}  ({note})")
+        for i, _ in enumerate(written, start=1):
+            note = _SCAN_PROFILES[i - 1][3]
+            print(f"  [{i:02d}/{n}] {filenames[i - 1]}  ({note})")
 
     print("-" * 60)
     print(f"Done.  Run the pipeline with:")
@@ -16,6 +16,7 @@ generated samples, copy your DICOM files into data/raw/ first:
     python scripts/run_full_pipeline.py
 """
 
+import json
 import logging
 import os
 import sys
@@ -24,21 +25,12 @@ import sys
 _REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, _REPO_ROOT)
 
-import matplotlib
-matplotlib.use("Agg")  # non-interactive backend — works without a display
-
 import pydicom
 
 from src.config import CONFIG
 from src.pipeline import process_folder
 from src.clustering import cluster_scan
 from src.scanner_qc import run_qc
-from src.visualization import (
-    plot_raw_scan,
-    plot_windowed_comparison,
-    plot_clustering,
-    plot_fleet_qc,
-)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -52,6 +44,7 @@ logger = logging.getLogger(__name__)
 INPUT_FOLDER = os.path.join(_REPO_ROOT, CONFIG["paths"]["input_folder"])
 OUTPUT_FOLDER = os.path.join(_REPO_ROOT, CONFIG["paths"]["output_folder"])
 REPORTS_FOLDER = os.path.join(_REPO_ROOT, CONFIG["paths"]["reports_folder"])
+RESULTS_FILE = os.path.join(_REPO_ROOT, CONFIG["paths"]["results_file"])
 
 
 def _ensure_sample_data() -> None:
@@ -66,6 +59,48 @@ def _ensure_sample_data() -> None:
     generate(INPUT_FOLDER)
 
 
+def _setup_viz():
+    """
+    Import the plotting helpers, on the non-interactive backend.
+
+    Deferred to Step 5 so matplotlib is only loaded once there is
+    something to plot, not at startup.
+    """
+    import matplotlib
+    matplotlib.use("Agg")  # non-interactive backend — works without a display
+
+    from src import visualization
+    return visualization
+
+
+def _save_results(cluster_file: str, silhouette: float, records, labels, qc_sil: float) -> None:
+    """
+    Write the clustering and QC numbers to RESULTS_FILE.
+
+    generate_pipeline_summary.py runs straight after this script in CI and
+    reports the same numbers; reading them back saves it from decoding
+    every processed scan a second time.
+    """
+    results = {
+        "clustering": {"file": cluster_file, "silhouette": silhouette},
+        "qc": {
+            "silhouette": qc_sil,
+            "scans": [
+                {
+                    "filename": rec.filename,
+                    "avg_density": rec.avg_density,
+                    "contrast": rec.contrast,
+                    "peak_value": rec.peak_value,
+                    "label": int(lbl),
+                }
+                for rec, lbl in zip(records, labels)
+            ],
+        },
+    }
+    with open(RESULTS_FILE, "w") as f:
+        json.dump(results, f, indent=2)
+
+
 def main() -> None:
     os.makedirs(REPORTS_FOLDER, exist_ok=True)
 
@@ -106,35 +141,42 @@ def main() -> None:
     print("=" * 60)
     print("STEP 4 — Scanner QC (fleet-level outlier detection)")
     print("=" * 60)
-    records, matrix, labels, qc_sil = run_qc(OUTPUT_FOLDER, n_clusters=2)
+    records, matrix, labels, qc_sil = run_qc(
+        OUTPUT_FOLDER,
+        n_clusters=2,
+        silhouette_sample_size=CONFIG["clustering"]["silhouette_sample_size"],
+    )
     print(f"  Scans analysed : {len(records)}")
     print(f"  QC silhouette  : {qc_sil:.3f}")
     for rec, lbl in zip(records, labels):
         flag = " ⚠ outlier?" if lbl != 0 else ""
         print(f"    {rec.filename}: group {lbl}  density={rec.avg_density:.1f}  contrast={rec.contrast:.1f}{flag}")
+    _save_results(input_files[0], silhouette, records, labels, qc_sil)
     print()
 
     # ── Step 5: Save visualisations ────────────────────────────────────────
     print("=" * 60)
     print("STEP 5 — Saving visualisations to reports/")
     print("=" * 60)
+    viz = _setup_viz()
 
-    fig = plot_raw_scan(ds, title=f"Raw scan — {input_files[0]}")
+    fig = viz.plot_raw_scan(ds, title=f"Raw scan — {input_files[0]}")
     path = os.path.join(REPORTS_FOLDER, "raw_scan.png")
     fig.savefig(path, dpi=100, bbox_inches="tight")
     print(f"  Saved: {path}")
 
-    fig = plot_windowed_comparison(ds)
+    fig = viz.plot_windowed_comparison(ds)
     path = os.path.join(REPORTS_FOLDER, "windowed_comparison.png")
     fig.savefig(path, dpi=100, bbox_inches="tight")
     print(f"  Saved: {path}")
 
-    fig = plot_clustering(ds, n_clusters=3)
+    # Reuse Step 3's result rather than clustering the same slice again
+    fig = viz.plot_clustering(ds, n_clusters=3, precomputed=(windowed, cluster_map, silhouette))
     path = os.path.join(REPORTS_FOLDER, "clustering.png")
     fig.savefig(path, dpi=100, bbox_inches="tight")
     print(f"  Saved: {path}")
 
-    fig = plot_fleet_qc(records, labels, qc_sil)
+    fig = viz.plot_fleet_qc(records, labels, qc_sil)
     path = os.path.join(REPORTS_FOLDER, "fleet_qc.png")
     fig.savefig(path, dpi=100, bbox_inches="tight")
     print(f"  Saved: {path}")
@@ -0,0 +1,175 @@
+"""
+_kernels.py - Per-pixel inner loops shared by windowing, clustering and
+scanner QC.
+
+Each kernel takes plain contiguous arrays and scalars (never a pydicom
+Dataset) and either writes into a caller-supplied *out* array or reduces
+to a few scalars.  When Numba is
+installed they are compiled into single parallel passes over the pixels;
+otherwise equivalent NumPy code runs, still in place so no full-size
+temporaries are allocated beyond *out* itself.
+
+Numba is optional — it is not in requirements.txt and nothing here
+changes results when it is missing.  Compiled kernels are cached on disk
+(``cache=True``), so the JIT cost is paid once per machine rather than at
+every import; there is no import-time warm-up because the kernels are
+specialised per input dtype, which isn't known until a scan is read.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # pragma: no cover - depends on the environment
+    njit = None
+
+
+def _window_hu_numpy(
+    pixels: np.ndarray,
+    slope: float,
+    intercept: float,
+    center: float,
+    width: float,
+    out: np.ndarray,
+) -> np.ndarray:
+    lower = center - width / 2.0
+    out[...] = pixels
+    out *= slope
+    out += intercept
+    np.clip(out, lower, lower + width, out=out)
+    out -= lower
+    out *= 1.0 / width
+    return out
+
+
+def _assign_labels_numpy(
+    values: np.ndarray,
+    bin_labels: np.ndarray,
+    out: np.ndarray,
+) -> np.ndarray:
+    n_bins = len(bin_labels)
+    idx = values * n_bins
+    np.minimum(idx, n_bins - 1, out=idx)
+    np.take(bin_labels, idx.astype(np.intp), out=out)
+    return out
+
+
+def _pixel_stats_numpy(pixels: np.ndarray) -> tuple[float, float, float]:
+    flat = pixels.reshape(-1)
+    n = flat.size
+    mean = flat.sum(dtype=np.float64) / n
+    # einsum casts to float64 in small buffered blocks, not a full copy
+    mean_sq = np.einsum("i,i->", flat, flat, dtype=np.float64) / n
+    std = np.sqrt(max(mean_sq - mean * mean, 0.0))
+    return float(mean), float(std), float(flat.max())
+
+
+if njit is not None:
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _window_hu_numba(pixels, slope, intercept, center, width, out):
+        lower = center - width / 2.0
+        upper = lower + width
+        inv_width = 1.0 / width
+        flat_in = pixels.reshape(pixels.size)
+        flat_out = out.reshape(out.size)
+        for i in prange(flat_in.size):
+            hu = flat_in[i] * slope + intercept
+            if hu < lower:
+                hu = lower
+            elif hu > upper:
+                hu = upper
+            flat_out[i] = (hu - lower) * inv_width
+        return out
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _assign_labels_numba(values, bin_labels, out):
+        n_bins = bin_labels.size
+        flat_in = values.reshape(values.size)
+        flat_out = out.reshape(out.size)
+        for i in prange(flat_in.size):
+            b = int(flat_in[i] * n_bins)
+            if b > n_bins - 1:
+                b = n_bins - 1
+            flat_out[i] = bin_labels[b]
+        return out
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _pixel_stats_numba(rows):
+        # One pass: each row's sum, sum of squares and max in parallel, then
+        # a short serial combine of the per-row partials
+        n_rows, n_cols = rows.shape
+        sums = np.zeros(n_rows)
+        sqs = np.zeros(n_rows)
+        maxes = np.empty(n_rows)
+        for r in prange(n_rows):
+            s = 0.0
+            sq = 0.0
+            mx = float(rows[r, 0])
+            for c in range(n_cols):
+                v = float(rows[r, c])
+                s += v
+                sq += v * v
+                if v > mx:
+                    mx = v
+            sums[r] = s
+            sqs[r] = sq
+            maxes[r] = mx
+        n = rows.size
+        mean = sums.sum() / n
+        var = sqs.sum() / n - mean * mean
+        return mean, np.sqrt(max(var, 0.0)), maxes.max()
+
+
+def window_hu(
+    pixels: np.ndarray,
+    slope: float,
+    intercept: float,
+    center: float,
+    width: float,
+    out: np.ndarray,
+) -> np.ndarray:
+    """
+    Rescale stored *pixels* to HU and window them to [0, 1] into *out*.
+
+    Same result as ``apply_window(to_hounsfield(...))`` in one pass.
+    *width* must already have been checked to be > 0.
+    """
+    pixels = np.ascontiguousarray(pixels)
+    if njit is not None:
+        return _window_hu_numba(pixels, float(slope), float(intercept),
+                                float(center), float(width), out)
+    return _window_hu_numpy(pixels, slope, intercept, center, width, out)
+
+
+def assign_labels(
+    values: np.ndarray,
+    bin_labels: np.ndarray,
+    out: np.ndarray,
+) -> np.ndarray:
+    """
+    Label each of *values* (in [0, 1]) with the label of its histogram bin.
+
+    *bin_labels* holds one label per bin, the bins splitting [0, 1] evenly;
+    a value of exactly 1.0 goes in the last bin.
+    """
+    values = np.ascontiguousarray(values)
+    if njit is not None:
+        return _assign_labels_numba(values, bin_labels, out)
+    return _assign_labels_numpy(values, bin_labels, out)
+
+
+def pixel_stats(pixels: np.ndarray) -> tuple[float, float, float]:
+    """
+    Mean, standard deviation and maximum of *pixels* in a single pass.
+
+    Sums are accumulated in float64 straight from the stored integers, so
+    there is no full-size float64 copy of the image and no second pass for
+    the variance.
+    """
+    pixels = np.ascontiguousarray(pixels)
+    if njit is not None and pixels.size > 0:
+        rows = pixels.reshape(pixels.shape[0] if pixels.ndim > 1 else 1, -1)
+        mean, std, peak = _pixel_stats_numba(rows)
+        return float(mean), float(std), float(peak)
+    return _pixel_stats_numpy(pixels)
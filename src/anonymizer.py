@@ -20,13 +20,23 @@ References
 """
 
 import logging
+import os
+import tempfile
 from typing import Optional
 
 import pydicom
+from pydicom.datadict import dictionary_VR, keyword_for_tag, tag_for_keyword
 from pydicom.dataset import Dataset
+from pydicom.tag import BaseTag, Tag
 
 logger = logging.getLogger(__name__)
 
+# Elements larger than this (PixelData, overlays, icon images) are left in
+# the source file when it's read and only streamed across at save time.
+# The anonymizer never looks at them, so there's no reason to hold the
+# pixel bytes in memory between read and write.
+DEFER_SIZE = "1 KB"
+
 # ---------------------------------------------------------------------------
 # Tag lists — driven by configuration, not scattered through code
 # ---------------------------------------------------------------------------
@@ -75,6 +85,42 @@ TAGS_TO_REPLACE: dict[str, str] = {
 }
 
 
+# The same lists keyed by tag number, resolved once at import rather than
+# translating every keyword on every file.  Matching them against the tags
+# a dataset actually holds is then a set intersection.
+_REMOVE_TAGS: frozenset[BaseTag] = frozenset(Tag(tag_for_keyword(name)) for name in TAGS_TO_REMOVE)
+_REPLACE_TAGS: dict[BaseTag, str] = {
+    Tag(tag_for_keyword(name)): value for name, value in TAGS_TO_REPLACE.items()
+}
+
+
+def _may_hold_private_tags(ds: Dataset) -> bool:
+    """
+    Cheap check for whether ``ds.remove_private_tags()`` has anything to do.
+
+    remove_private_tags() walks every element, sequences included, and
+    converts each one on the way.  Here only the tags and VRs of the
+    top-level elements are looked at: a private tag means yes, and so does
+    any sequence, because its items can hold private tags of their own.
+    """
+    # elements() yields them as read (RawDataElement), so nothing is decoded
+    for elem in ds.elements():
+        tag = elem.tag
+        if tag.is_private:
+            return True
+        vr = elem.VR
+        if vr is None or vr == "UN":
+            # Implicit VR or unknown: go by the data dictionary, and assume
+            # the worst for tags it doesn't know
+            try:
+                vr = dictionary_VR(tag)
+            except KeyError:
+                return True
+        if vr == "SQ":
+            return True
+    return False
+
+
 def anonymize_dataset(
     ds: Dataset,
     station_name: str = "REMOTE_MOBILE_01",
@@ -101,22 +147,29 @@ def anonymize_dataset(
     Dataset
         The same Dataset object, now de-identified.
     """
+    present = ds.keys()
+    # Checked once per dataset rather than by every logger.debug() call
+    debug = logger.isEnabledFor(logging.DEBUG)
+
     # Step 1 — Remove PHI tags
-    for tag_name in TAGS_TO_REMOVE:
-        if hasattr(ds, tag_name):
-            delattr(ds, tag_name)
-            logger.debug("Removed tag: %s", tag_name)
+    for tag in _REMOVE_TAGS & present:
+        del ds[tag]
+        if debug:
+            logger.debug("Removed tag: %s", keyword_for_tag(tag) or tag)
 
     # Step 2 — Replace date/time tags with neutral values
-    for tag_name, dummy_value in TAGS_TO_REPLACE.items():
-        if hasattr(ds, tag_name):
-            setattr(ds, tag_name, dummy_value)
-            logger.debug("Replaced tag %s → %s", tag_name, dummy_value)
+    for tag in _REPLACE_TAGS.keys() & present:
+        ds[tag].value = _REPLACE_TAGS[tag]
+        if debug:
+            logger.debug("Replaced tag %s → %s", keyword_for_tag(tag) or tag, _REPLACE_TAGS[tag])
 
     # Step 3 — Remove all private (odd-group) tags.
     # Private tags are vendor extensions and may contain PHI we cannot
     # enumerate in advance, so blanket removal is the safe approach.
-    ds.remove_private_tags()
+    # (Skipped when there's provably nothing to remove, e.g. the synthetic
+    # sample scans, which have neither private tags nor sequences.)
+    if _may_hold_private_tags(ds):
+        ds.remove_private_tags()
 
     # Step 4 — DICOM-standard de-identification markers
     # PatientIdentityRemoved (0012,0062): "YES" signals downstream systems
@@ -158,7 +211,27 @@ def anonymize_file(
     pydicom.errors.InvalidDicomError
         If the file cannot be read as DICOM.
     """
-    ds = pydicom.dcmread(input_path)
+    # save_as writes in the source transfer syntax by default, so the
+    # deferred pixel bytes are copied through without any re-encoding
+    ds = pydicom.dcmread(input_path, defer_size=DEFER_SIZE)
     anonymize_dataset(ds, station_name=station_name)
-    ds.save_as(output_path)
+
+    # Write to a temporary file next to the output and move it into place
+    # only once it is complete, so a dataset that fails to encode (or a
+    # crash mid-write) never leaves a half-written file at output_path.
+    # The deferred pixel bytes are streamed straight to disk, not buffered.
+    # (A dot-file, so folder scans skip one left behind by a hard kill.)
+    with tempfile.NamedTemporaryFile(
+        dir=os.path.dirname(os.path.abspath(output_path)),
+        prefix=".",
+        suffix=".tmp",
+        delete=False,
+    ) as tmp:
+        try:
+            ds.save_as(tmp)
+        except BaseException:
+            tmp.close()
+            os.unlink(tmp.name)
+            raise
+    os.replace(tmp.name, output_path)
     logger.info("Anonymized %s → %s", input_path, output_path)
@@ -4,6 +4,19 @@ clustering.py - Intensity-based clustering for DICOM scan visualisation.
 This module applies K-Means clustering to the pixel intensity values of
 a single CT slice.  The goal is **visualisation**, not diagnosis.
 
+HOW IT'S COMPUTED
+-----------------
+The feature is a single intensity in [0, 1], so pixels with the same
+(binned) intensity always end up in the same cluster.  For k <= 8 Lloyd's
+algorithm therefore runs on a 1024-bin intensity histogram (1024 weighted
+points) instead of every pixel.  Bin width is 1/1024 of the window, well
+below anything visible in the cluster map.  Larger k falls back to
+scikit-learn's KMeans, fitted on a random sample of 10k pixels with a
+single k-means++ start (in one dimension the seeding already lands near
+the optimum, so extra restarts only repeat the same answer) and then used
+to label every pixel.  The silhouette score is computed exactly for 1-D
+data from sorted prefix sums rather than a pairwise distance matrix.
+
 WHY K-MEANS HERE?
 -----------------
 K-Means groups pixels by HU-like intensity value into k clusters.
@@ -30,13 +43,120 @@ from typing import Optional
 
 import numpy as np
 from pydicom.dataset import Dataset
-from sklearn.cluster import KMeans
-from sklearn.metrics import silhouette_score
 
+from src._kernels import assign_labels
 from src.windowing import window_from_dataset
 
 logger = logging.getLogger(__name__)
 
+# Histogram resolution for the 1-D Lloyd's path, and the largest k it handles
+HISTOGRAM_BINS = 1024
+MAX_HISTOGRAM_CLUSTERS = 8
+
+# Random pixel samples: the KMeans fallback is fitted on the first
+# FIT_SAMPLE_SIZE, the silhouette score computed on the first
+# SILHOUETTE_SAMPLE_SIZE of the same draw
+FIT_SAMPLE_SIZE = 10_000
+SILHOUETTE_SAMPLE_SIZE = 5000
+
+
+def _histogram_kmeans(
+    values: np.ndarray,
+    n_clusters: int,
+    max_iter: int = 100,
+) -> np.ndarray:
+    """
+    Lloyd's algorithm on the intensity histogram of *values* (in [0, 1]).
+
+    Centroids start at evenly spaced quantiles of the intensity
+    distribution and are refined until the assignment stops changing;
+    a cluster that ends up empty is re-seeded on the worst-fitting bin.
+
+    Returns
+    -------
+    np.ndarray
+        Integer label per element of *values* (same shape).  Labels are
+        ordered by centroid, so label 0 is always the darkest cluster.
+    """
+    counts, edges = np.histogram(values, bins=HISTOGRAM_BINS, range=(0.0, 1.0))
+    centers = (edges[:-1] + edges[1:]) / 2
+    weights = counts.astype(np.float64)
+
+    cdf = np.cumsum(weights)
+    quantiles = (np.arange(n_clusters) + 0.5) / n_clusters * cdf[-1]
+    centroids = centers[np.searchsorted(cdf, quantiles)]
+
+    bin_labels = None
+    for _ in range(max_iter):
+        new_labels = np.abs(centers[:, None] - centroids[None, :]).argmin(axis=1)
+        if bin_labels is not None and np.array_equal(new_labels, bin_labels):
+            break
+        bin_labels = new_labels
+        mass = np.bincount(bin_labels, weights=weights, minlength=n_clusters)
+        moment = np.bincount(bin_labels, weights=weights * centers, minlength=n_clusters)
+        centroids = np.where(mass > 0, moment / np.maximum(mass, 1), centroids)
+        # A cluster left with no pixels (e.g. a duplicate seed when one
+        # intensity, such as air, holds more than 1/k of the image) would
+        # otherwise stay empty for good.  As sklearn does, move it onto the
+        # bin that adds the most to the inertia.
+        empty = np.flatnonzero(mass == 0)
+        if empty.size:
+            cost = weights * (centers - centroids[bin_labels]) ** 2
+            centroids[empty] = centers[np.argsort(cost)[::-1][:empty.size]]
+
+    # Relabel so cluster ids follow intensity
+    rank = np.empty(n_clusters, dtype=np.intp)
+    rank[np.argsort(centroids)] = np.arange(n_clusters)
+    bin_labels = rank[bin_labels]
+
+    # The one per-pixel pass: look up each pixel's bin label
+    return assign_labels(values, bin_labels, np.empty(values.shape, dtype=np.intp))
+
+
+def _silhouette_1d(values: np.ndarray, labels: np.ndarray, n_clusters: int) -> float:
+    """
+    Exact mean silhouette coefficient for one-dimensional *values*.
+
+    Same result as ``sklearn.metrics.silhouette_score(values[:, None],
+    labels)``, but instead of the full n x n distance matrix it sorts each
+    cluster once and gets every value's summed distance to that cluster
+    from prefix sums: O(k n log n) rather than O(n^2), milliseconds rather
+    than a quarter of a second on the 5000-pixel sample.
+    """
+    values = values.astype(np.float64)
+    n = len(values)
+    sizes = np.bincount(labels, minlength=n_clusters)
+    if not 2 <= np.count_nonzero(sizes) <= n - 1:
+        raise ValueError(
+            f"Number of labels is {np.count_nonzero(sizes)}. "
+            "Valid values are 2 to n_samples - 1 (inclusive)"
+        )
+
+    # dist[c, i] = sum of |values[i] - y| over the members y of cluster c
+    dist = np.full((n_clusters, n), np.inf)
+    for c in np.flatnonzero(sizes):
+        members = np.sort(values[labels == c])
+        csum = np.concatenate(([0.0], np.cumsum(members)))
+        below = np.searchsorted(members, values, side="right")
+        dist[c] = (values * below - csum[below]) + (
+            (csum[-1] - csum[below]) - values * (len(members) - below)
+        )
+
+    own = sizes[labels]
+    rows = np.arange(n)
+    # Mean distance to the rest of the own cluster (self contributes 0)...
+    a = dist[labels, rows] / np.maximum(own - 1, 1)
+    # ...and to the nearest other cluster
+    dist /= np.maximum(sizes, 1)[:, None]
+    dist[labels, rows] = np.inf
+    b = dist.min(axis=0)
+
+    denom = np.maximum(a, b)
+    s = np.divide(b - a, denom, out=np.zeros(n), where=denom > 0)
+    # sklearn's convention: a point alone in its cluster scores 0
+    s[own == 1] = 0.0
+    return float(s.mean())
+
 
 def cluster_scan(
     ds: Dataset,
@@ -60,7 +180,8 @@ def cluster_scan(
     window_preset : str
         Windowing preset to apply before clustering.
     random_state : int
-        Random seed for reproducible results.
+        Random seed for reproducible results (KMeans fallback only; the
+        histogram path is deterministic).
 
     Returns
     -------
@@ -75,20 +196,37 @@ def cluster_scan(
     """
     windowed = window_from_dataset(ds, preset=window_preset)
 
-    # Flatten to a column vector for KMeans
-    X = windowed.reshape(-1, 1)
+    # Flatten to a contiguous float32 column vector for KMeans (sklearn
+    # keeps float32 input as float32 rather than upcasting)
+    X = np.ascontiguousarray(windowed.reshape(-1, 1), dtype=np.float32)
 
-    kmeans = KMeans(n_clusters=n_clusters, random_state=random_state, n_init=10)
-    labels = kmeans.fit_predict(X)
+    # One random pixel sample serves both the KMeans fit and the silhouette
+    rng = np.random.default_rng(random_state)
+    idx = rng.choice(len(X), size=min(len(X), FIT_SAMPLE_SIZE), replace=False)
+
+    if n_clusters <= MAX_HISTOGRAM_CLUSTERS:
+        labels = _histogram_kmeans(X.ravel(), n_clusters)
+    else:
+        from sklearn.cluster import KMeans
+
+        kmeans = KMeans(
+            n_clusters=n_clusters,
+            init="k-means++",
+            n_init=1,
+            algorithm="elkan",
+            random_state=random_state,
+        )
+        # The map is for display, so centroids from a sample are as good
+        # as centroids from every pixel; predict() then labels them all
+        kmeans.fit(X[idx])
+        labels = kmeans.predict(X)
 
     cluster_map = labels.reshape(windowed.shape)
 
     # Silhouette score quantifies cluster separation.
     # We subsample for speed — exact score not required for QC use.
-    sample_size = min(len(X), 5000)
-    rng = np.random.default_rng(random_state)
-    idx = rng.choice(len(X), size=sample_size, replace=False)
-    score = silhouette_score(X[idx], labels[idx])
+    sil_idx = idx[:SILHOUETTE_SAMPLE_SIZE]
+    score = _silhouette_1d(X[sil_idx, 0], labels[sil_idx], n_clusters)
 
     logger.info(
         "Clustering complete: k=%d, silhouette=%.3f", n_clusters, score
@@ -14,17 +14,24 @@ from typing import Any
 _REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 _CONFIG_PATH = os.path.join(_REPO_ROOT, "config.yaml")
 
+# libyaml's C parser when PyYAML was built with it (most wheels are), about
+# 8x faster than the pure-Python SafeLoader; both accept the same input
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 _DEFAULTS: dict[str, Any] = {
     "paths": {
         "input_folder": "data/raw",
         "output_folder": "data/processed",
         "reports_folder": "reports",
+        "results_file": "reports/pipeline_results.json",
     },
     "anonymization": {
         "station_name": "REMOTE_MOBILE_01",
     },
     "pipeline": {
         "max_files": None,
+        "max_workers": None,
+        "simulate_latency": False,
         "retry": {
             "max_attempts": 5,
             "base_delay": 1.0,
@@ -33,6 +40,7 @@ _DEFAULTS: dict[str, Any] = {
     },
     "clustering": {
         "n_clusters": 3,
+        "silhouette_sample_size": 2000,
     },
 }
 
@@ -64,7 +72,7 @@ def load_config(config_path: str = _CONFIG_PATH) -> dict[str, Any]:
     """
     if os.path.exists(config_path):
         with open(config_path, "r") as f:
-            user_config = yaml.safe_load(f) or {}
+            user_config = yaml.load(f, Loader=_YAML_LOADER) or {}
     else:
         user_config = {}
 
@@ -24,16 +24,47 @@ LIMITATIONS
 
 import logging
 import os
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+from typing import Iterator, Optional
 
 import numpy as np
 import pydicom
-from sklearn.cluster import KMeans
-from sklearn.metrics import silhouette_score
-from sklearn.preprocessing import StandardScaler
+from pydicom.uid import ExplicitVRLittleEndian, ImplicitVRLittleEndian
+
+from src._kernels import pixel_stats
 
 logger = logging.getLogger(__name__)
 
+# Below this many files extract_features reads them in-process: starting
+# worker processes costs more than decoding a handful of slices
+PARALLEL_MIN_FILES = 16
+
+# From this many scans on, run_qc clusters with MiniBatchKMeans in batches
+# of this size instead of full-batch KMeans with ten restarts
+MINIBATCH_MIN_SCANS = 1024
+
+# silhouette_score is O(n²) in the number of scans; past this many it is
+# estimated on a random sample of this size instead (run_qc's
+# silhouette_sample_size=None asks for the exact score).  A 2000-scan
+# sample is typically within 0.01 of the exact score, at a fraction of the
+# cost.
+SILHOUETTE_SAMPLE_SIZE = 2000
+
+# Elements larger than this aren't read by dcmread - in particular the
+# pixel data, which _mapped_pixels can then map straight from the file
+DEFER_SIZE = "1 KB"
+
+# Transfer syntaxes whose PixelData is the stored pixels as they are
+_RAW_LE_SYNTAXES = frozenset({ExplicitVRLittleEndian, ImplicitVRLittleEndian})
+
+# pydicom 3 can hand back a deferred element without reading it.  2.x always
+# reads it, so _mapped_pixels just falls through to pixel_array there.
+if int(pydicom.__version__.split(".")[0]) >= 3:
+    _KEEP_DEFERRED = {"keep_deferred": True}
+else:
+    _KEEP_DEFERRED = {}
+
 
 @dataclass
 class ScanFeatures:
@@ -44,10 +75,96 @@ class ScanFeatures:
     peak_value: float     # Max pixel value — proxy for peak bone/contrast density
 
 
-def extract_features(folder: str) -> tuple[list[ScanFeatures], np.ndarray]:
+@dataclass
+class ScanFeatureBatch:
+    """
+    ScanFeatures for a whole fleet, stored as one array rather than a list.
+
+    Row i of *features* belongs to ``filenames[i]``, so fleet-wide work
+    (scaling, plotting, summary statistics) runs on whole columns.
+    Indexing or iterating yields ScanFeatures records for display.
+    """
+    filenames: list[str]
+    features: np.ndarray  # (n, 3) float32: avg_density, contrast, peak_value
+
+    def __len__(self) -> int:
+        return len(self.filenames)
+
+    def __getitem__(self, i: int) -> ScanFeatures:
+        return ScanFeatures(self.filenames[i], *self.features[i].tolist())
+
+    def __iter__(self) -> Iterator[ScanFeatures]:
+        for fname, row in zip(self.filenames, self.features.tolist()):
+            yield ScanFeatures(fname, *row)
+
+
+def _mapped_pixels(ds: pydicom.Dataset, full_path: str) -> Optional[np.ndarray]:
+    """
+    Memory-map *ds*'s pixel data read-only from *full_path*, if possible.
+
+    Only plain uncompressed 16-bit greyscale qualifies, where all 16 bits
+    are stored and the pixels are exactly what ``pixel_array`` would give
+    (no bit masking or sign extension).  Returns None otherwise, or when
+    dcmread already read the pixel data rather than deferring it.
+    """
+    elem = ds.get_item(0x7FE00010, **_KEEP_DEFERRED)  # PixelData, unread
+    if elem is None or elem.value is not None:
+        return None
+    file_meta = getattr(ds, "file_meta", None)
+    if (
+        getattr(file_meta, "TransferSyntaxUID", None) not in _RAW_LE_SYNTAXES
+        or ds.get("BitsAllocated") != 16
+        or ds.get("BitsStored") != 16
+        or ds.get("SamplesPerPixel", 1) != 1
+    ):
+        return None
+    rows, cols = ds.get("Rows", 0), ds.get("Columns", 0)
+    n_pixels = rows * cols * int(ds.get("NumberOfFrames", 1) or 1)
+    if n_pixels == 0 or elem.length != 2 * n_pixels:
+        return None
+
+    dtype = "<i2" if ds.get("PixelRepresentation", 0) == 1 else "<u2"
+    return np.memmap(
+        full_path, dtype=dtype, mode="r",
+        offset=elem.value_tell, shape=(n_pixels // cols, cols),
+    )
+
+
+def _scan_one(full_path: str) -> Optional[tuple[float, float, float]]:
+    """
+    Read one DICOM file and reduce it to (avg_density, contrast, peak_value).
+
+    Runs in a worker process, so it returns only a plain tuple (never the
+    Dataset, nor a record that has to be unpacked again into the feature
+    matrix) and logs rather than raises on failure, returning None.
+    """
+    fname = os.path.basename(full_path)
+    try:
+        ds = pydicom.dcmread(full_path, force=True, defer_size=DEFER_SIZE)
+        # Uncompressed slices are reduced straight from the page cache;
+        # anything else is decoded into a new array as usual
+        pixels = _mapped_pixels(ds, full_path)
+        if pixels is None:
+            pixels = ds.pixel_array
+        mean, std, peak = pixel_stats(pixels)
+    except Exception as exc:
+        logger.warning("Could not process %s: %s", fname, exc)
+        return None
+
+    logger.debug(
+        "Extracted features from %s: density=%.1f, contrast=%.1f, peak=%.1f",
+        fname, mean, std, peak,
+    )
+    return mean, std, peak
+
+
+def extract_features(folder: str) -> tuple[ScanFeatureBatch, np.ndarray]:
     """
     Walk *folder* and extract three scalar features from each DICOM file.
 
+    Decoding dominates and holds the GIL, so folders of PARALLEL_MIN_FILES
+    or more are spread over a process pool; results keep filename order.
+
     Parameters
     ----------
     folder : str
@@ -55,53 +172,57 @@ def extract_features(folder: str) -> tuple[list[ScanFeatures], np.ndarray]:
 
     Returns
     -------
-    feature_records : list[ScanFeatures]
-        Per-file feature structs (includes filenames for labelling).
+    feature_records : ScanFeatureBatch
+        Per-file features (includes filenames for labelling).
     feature_matrix : np.ndarray
-        Shape (n_files, 3) float array ready for clustering.
+        Shape (n_files, 3) float32 array ready for clustering — the same
+        array as ``feature_records.features``.
         Columns: [avg_density, contrast, peak_value].
     """
     if not os.path.isdir(folder):
         logger.error("Folder not found: %s", folder)
-        return [], np.empty((0, 3))
-
-    files = sorted(f for f in os.listdir(folder) if not f.startswith("."))
-    records: list[ScanFeatures] = []
-
-    for fname in files:
-        full_path = os.path.join(folder, fname)
-        try:
-            ds = pydicom.dcmread(full_path, force=True)
-            pixels = ds.pixel_array.astype(np.float64)
-            rec = ScanFeatures(
-                filename=fname,
-                avg_density=float(np.mean(pixels)),
-                contrast=float(np.std(pixels)),
-                peak_value=float(np.max(pixels)),
-            )
-            records.append(rec)
-            logger.debug(
-                "Extracted features from %s: density=%.1f, contrast=%.1f, peak=%.1f",
-                fname, rec.avg_density, rec.contrast, rec.peak_value,
-            )
-        except Exception as exc:
-            logger.warning("Could not process %s: %s", fname, exc)
-
-    if not records:
-        return [], np.empty((0, 3))
-
-    matrix = np.array(
-        [[r.avg_density, r.contrast, r.peak_value] for r in records],
-        dtype=np.float64,
-    )
-    return records, matrix
+        empty = ScanFeatureBatch([], np.empty((0, 3), dtype=np.float32))
+        return empty, empty.features
+
+    # scandir entries carry their full path and file type, so there's no
+    # join or stat per file, and subfolders are skipped for free
+    with os.scandir(folder) as it:
+        entries = sorted(
+            (e for e in it if not e.name.startswith(".") and e.is_file()),
+            key=lambda e: e.name,
+        )
+    paths = [e.path for e in entries]
+
+    workers = os.cpu_count() or 1
+    if len(paths) >= PARALLEL_MIN_FILES and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            # map() yields in submission order; chunks of several files keep
+            # the per-task pickling overhead down
+            chunksize = max(1, len(paths) // (4 * workers))
+            results = list(ex.map(_scan_one, paths, chunksize=chunksize))
+    else:
+        results = map(_scan_one, paths)
+
+    # Filled row by row as records arrive and trimmed to the files that
+    # read cleanly.  float32 and C-ordered: the form sklearn's KMeans works
+    # in, so it doesn't make its own converted copy.
+    matrix = np.empty((len(paths), 3), dtype=np.float32)
+    filenames: list[str] = []
+    for entry, stats in zip(entries, results):
+        if stats is None:
+            continue
+        matrix[len(filenames)] = stats
+        filenames.append(entry.name)
+    batch = ScanFeatureBatch(filenames, matrix[:len(filenames)])
+    return batch, batch.features
 
 
 def run_qc(
     folder: str,
     n_clusters: int = 2,
     random_state: int = 42,
-) -> tuple[list[ScanFeatures], np.ndarray, np.ndarray, float]:
+    silhouette_sample_size: Optional[int] = SILHOUETTE_SAMPLE_SIZE,
+) -> tuple[ScanFeatureBatch, np.ndarray, np.ndarray, float]:
     """
     Extract features and cluster the fleet to surface potential outliers.
 
@@ -118,13 +239,17 @@ def run_qc(
         for outlier detection (one "typical" group, one "unusual" group).
     random_state : int
         Random seed for reproducibility.
+    silhouette_sample_size : int or None
+        Fleets larger than this have their silhouette score estimated on a
+        random sample of this many scans rather than computed exactly.
+        None always computes the exact score.
 
     Returns
     -------
-    records : list[ScanFeatures]
-        Feature records (one per file).
+    records : ScanFeatureBatch
+        Features, one row per file.
     feature_matrix : np.ndarray
-        Raw (un-scaled) feature matrix, shape (n, 3).
+        Raw (un-scaled) feature matrix, shape (n, 3) — ``records.features``.
     labels : np.ndarray
         Cluster label per scan, shape (n,).
     silhouette : float
@@ -137,15 +262,43 @@ def run_qc(
         labels = np.zeros(len(records), dtype=int)
         return records, matrix, labels, float("nan")
 
+    # sklearn is imported on first use, so that importing ScanFeatures
+    # (e.g. from the CI summary reading saved results) doesn't load it
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+    from sklearn.metrics import silhouette_score
+
     # Standardise: important because avg_density and peak_value have very
     # different scales, which would otherwise dominate the distance metric.
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(matrix)
+    # Three column means and deviations (accumulated in float64) don't need
+    # a StandardScaler; a constant column is left at zero, as it would be.
+    mu = matrix.mean(axis=0, dtype=np.float64)
+    sigma = matrix.std(axis=0, dtype=np.float64)
+    sigma[sigma == 0.0] = 1.0
+    X_scaled = ((matrix - mu) / sigma).astype(np.float32)
 
-    kmeans = KMeans(n_clusters=n_clusters, random_state=random_state, n_init=10)
+    if len(records) < MINIBATCH_MIN_SCANS:
+        kmeans = KMeans(n_clusters=n_clusters, random_state=random_state, n_init=10)
+    else:
+        # Large fleet: each Lloyd step sees one batch rather than every scan,
+        # and three restarts are plenty for 3-D features
+        kmeans = MiniBatchKMeans(
+            n_clusters=n_clusters,
+            random_state=random_state,
+            n_init=3,
+            batch_size=MINIBATCH_MIN_SCANS,
+            max_iter=100,
+        )
     labels = kmeans.fit_predict(X_scaled)
 
-    score = silhouette_score(X_scaled, labels) if (n_clusters > 1 and len(records) > n_clusters) else float("nan")
+    if n_clusters > 1 and len(records) > n_clusters:
+        sample_size = None
+        if silhouette_sample_size is not None and len(records) > silhouette_sample_size:
+            sample_size = silhouette_sample_size
+        score = silhouette_score(
+            X_scaled, labels, sample_size=sample_size, random_state=random_state
+        )
+    else:
+        score = float("nan")
     logger.info(
         "QC clustering: %d files, k=%d, silhouette=%.3f",
         len(records), n_clusters, score,
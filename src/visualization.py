@@ -12,15 +12,18 @@ import matplotlib.pyplot as plt
 import numpy as np
 from pydicom.dataset import Dataset
 
-from src.windowing import WINDOW_PRESETS, window_from_dataset
+from src.windowing import WINDOW_PRESET_ITEMS, apply_window, hounsfield_from_dataset
 from src.clustering import cluster_scan
-from src.scanner_qc import ScanFeatures
+from src.scanner_qc import ScanFeatureBatch
 
 logger = logging.getLogger(__name__)
 
 # Consistent figure style across all plots
 plt.rcParams.update({"figure.dpi": 100, "axes.titlesize": 11})
 
+# plot_fleet_qc labels each point with its filename only up to this many scans
+ANNOTATE_MAX_SCANS = 50
+
 
 def plot_raw_scan(ds: Dataset, title: str = "CT Slice") -> plt.Figure:
     """
@@ -57,13 +60,13 @@ def plot_windowed_comparison(ds: Dataset) -> plt.Figure:
     -------
     plt.Figure
     """
-    presets = list(WINDOW_PRESETS.keys())
-    fig, axes = plt.subplots(1, len(presets), figsize=(4 * len(presets), 4))
+    n_presets = len(WINDOW_PRESET_ITEMS)
+    fig, axes = plt.subplots(1, n_presets, figsize=(4 * n_presets, 4))
 
-    for ax, preset in zip(axes, presets):
-        windowed = window_from_dataset(ds, preset=preset)
-        center, width = WINDOW_PRESETS[preset]
-        ax.imshow(windowed, cmap="gray")
+    # Convert to HU once; each preset is then just a window over it
+    hu = hounsfield_from_dataset(ds)
+    for ax, (preset, center, width) in zip(axes, WINDOW_PRESET_ITEMS):
+        ax.imshow(apply_window(hu, center, width), cmap="gray")
         ax.set_title(f"{preset.replace('_', ' ').title()}\n(C={center}, W={width})")
         ax.axis("off")
 
@@ -72,7 +75,11 @@ def plot_windowed_comparison(ds: Dataset) -> plt.Figure:
     return fig
 
 
-def plot_clustering(ds: Dataset, n_clusters: int = 3) -> plt.Figure:
+def plot_clustering(
+    ds: Dataset,
+    n_clusters: int = 3,
+    precomputed: Optional[tuple[np.ndarray, np.ndarray, float]] = None,
+) -> plt.Figure:
     """
     Display original windowed scan alongside K-Means cluster map.
 
@@ -82,12 +89,18 @@ def plot_clustering(ds: Dataset, n_clusters: int = 3) -> plt.Figure:
         Loaded pydicom Dataset.
     n_clusters : int
         Number of intensity clusters.
+    precomputed : tuple, optional
+        ``cluster_scan(ds, n_clusters=n_clusters)``'s return value, if the
+        caller already has it — saves decoding, windowing and clustering
+        the slice a second time.
 
     Returns
     -------
     plt.Figure
     """
-    windowed, cluster_map, silhouette = cluster_scan(ds, n_clusters=n_clusters)
+    if precomputed is None:
+        precomputed = cluster_scan(ds, n_clusters=n_clusters)
+    windowed, cluster_map, silhouette = precomputed
 
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
 
@@ -108,7 +121,7 @@ def plot_clustering(ds: Dataset, n_clusters: int = 3) -> plt.Figure:
 
 
 def plot_fleet_qc(
-    records: list[ScanFeatures],
+    records: ScanFeatureBatch,
     labels: np.ndarray,
     silhouette: float,
 ) -> plt.Figure:
@@ -120,8 +133,8 @@ def plot_fleet_qc(
 
     Parameters
     ----------
-    records : list[ScanFeatures]
-        Per-file feature records (filenames used for point labels).
+    records : ScanFeatureBatch
+        Per-file features (filenames used for point labels).
     labels : np.ndarray
         Cluster label per scan.
     silhouette : float
@@ -131,28 +144,38 @@ def plot_fleet_qc(
     -------
     plt.Figure
     """
-    X = np.array([[r.avg_density, r.contrast] for r in records])
-    unique_labels = np.unique(labels)
-    colors = plt.cm.tab10(np.linspace(0, 0.5, len(unique_labels)))
+    X = records.features
 
     fig, ax = plt.subplots(figsize=(10, 6))
 
-    for label, color in zip(unique_labels, colors):
-        mask = labels == label
-        ax.scatter(
-            X[mask, 0], X[mask, 1],
-            s=100, color=color, label=f"Group {label}",
-        )
-
-    for i, rec in enumerate(records):
-        ax.annotate(
-            rec.filename,
-            (X[i, 0], X[i, 1]),
-            fontsize=8,
-            alpha=0.7,
-            xytext=(5, 5),
-            textcoords="offset points",
-        )
+    # One collection for every point, coloured by label rather than one
+    # scatter per group.  vmin/vmax pin group i to the colormap's i-th
+    # colour; past 20 groups the qualitative maps would clip, so they share
+    # a continuous one instead
+    n_groups = int(labels.max()) + 1 if len(labels) else 1
+    if n_groups <= 10:
+        cmap, vmax = "tab10", 9
+    elif n_groups <= 20:
+        cmap, vmax = "tab20", 19
+    else:
+        cmap, vmax = "viridis", n_groups - 1
+    sc = ax.scatter(X[:, 0], X[:, 1], s=100, c=labels, cmap=cmap, vmin=0, vmax=vmax)
+    # num=None: one handle per distinct label, not a "nice" subset of them
+    handles, _ = sc.legend_elements(num=None)
+    ax.legend(handles, [f"Group {label}" for label in np.unique(labels)])
+
+    # Filename labels only help on a small fleet; past that they are an
+    # unreadable pile and the slowest part of drawing the figure
+    if len(records) <= ANNOTATE_MAX_SCANS:
+        for i, fname in enumerate(records.filenames):
+            ax.annotate(
+                fname,
+                (X[i, 0], X[i, 1]),
+                fontsize=8,
+                alpha=0.7,
+                xytext=(5, 5),
+                textcoords="offset points",
+            )
 
     ax.set_title(
         f"Scanner QC — Fleet Overview\n"
@@ -161,7 +184,6 @@ def plot_fleet_qc(
     )
     ax.set_xlabel("Average Tissue Density (mean pixel value)")
     ax.set_ylabel("Image Contrast (pixel std dev)")
-    ax.legend()
     ax.grid(True, linestyle="--", alpha=0.6)
     fig.tight_layout()
     return fig
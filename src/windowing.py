@@ -30,6 +30,9 @@ from typing import Optional
 
 import numpy as np
 from pydicom.dataset import Dataset
+from pydicom.multival import MultiValue
+
+from src._kernels import window_hu
 
 logger = logging.getLogger(__name__)
 
@@ -43,11 +46,18 @@ WINDOW_PRESETS: dict[str, tuple[float, float]] = {
     "soft_tissue": (50.0, 400.0),
 }
 
+# The same presets flattened once at import, for code that walks all of them
+WINDOW_PRESET_NAMES: tuple[str, ...] = tuple(WINDOW_PRESETS)
+WINDOW_PRESET_ITEMS: tuple[tuple[str, float, float], ...] = tuple(
+    (name, center, width) for name, (center, width) in WINDOW_PRESETS.items()
+)
+
 
 def to_hounsfield(
     pixel_array: np.ndarray,
     slope: float = 1.0,
     intercept: float = 0.0,
+    out: Optional[np.ndarray] = None,
 ) -> np.ndarray:
     """
     Convert raw stored pixel values to Hounsfield Units.
@@ -60,19 +70,32 @@ def to_hounsfield(
         RescaleSlope from the DICOM header (default 1.0).
     intercept : float
         RescaleIntercept from the DICOM header (default 0.0).
+    out : np.ndarray, optional
+        Array to write the result into (e.g. a buffer reused across
+        slices); a new float32 array is allocated if omitted.
 
     Returns
     -------
     np.ndarray
-        Float array of HU values, same shape as *pixel_array*.
+        float32 array of HU values (or *out*), same shape as *pixel_array*.
     """
-    return pixel_array.astype(np.float64) * slope + intercept
+    # float32 is far more precision than display needs and is half
+    # the memory traffic of float64; scale in place on the one copy
+    if out is None:
+        hu = pixel_array.astype(np.float32)
+    else:
+        hu = out
+        np.copyto(hu, pixel_array, casting="unsafe")
+    hu *= slope
+    hu += intercept
+    return hu
 
 
 def apply_window(
     hu_array: np.ndarray,
     center: float,
     width: float,
+    out: Optional[np.ndarray] = None,
 ) -> np.ndarray:
     """
     Apply window/level to a HU array and return values normalised to [0, 1].
@@ -89,21 +112,96 @@ def apply_window(
         Window centre (level) in HU.
     width : float
         Window width in HU.
+    out : np.ndarray, optional
+        Array to write the result into.  May be *hu_array* itself to
+        window it in place; a new float32 array is allocated if omitted.
 
     Returns
     -------
     np.ndarray
-        Float array in [0, 1], same shape as *hu_array*.
+        float32 array in [0, 1] (or *out*), same shape as *hu_array*.
     """
+    if width <= 0:
+        raise ValueError(
+            f"Window width must be > 0, got width={width}."
+        )
     lower = center - width / 2.0
-    upper = center + width / 2.0
+    # Shift, scale and clip in place on one output buffer - a single new
+    # array instead of a temporary per step.  Clipping after normalising
+    # to [0, 1] is the same as clipping to [lower, upper] first.
+    out = np.subtract(hu_array, lower, out=out, dtype=np.float32)
+    out *= 1.0 / width  # one multiply per pixel is cheaper than a divide
+    np.clip(out, 0.0, 1.0, out=out)
+    return out
+
+
+def apply_sigmoid_window(
+    hu_array: np.ndarray,
+    center: float,
+    width: float,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Apply a sigmoid window (DICOM VOI LUT Function "SIGMOID") to HU values.
+
+    A smooth alternative to :func:`apply_window`'s linear ramp: values
+    roll off gradually instead of being clipped, so detail just outside
+    the window stays faintly visible.  Follows DICOM PS3.3 C.11.2.1.3.1:
+
+        y = 1 / (1 + exp(-4 * (HU - center) / width))
+
+    Parameters
+    ----------
+    hu_array : np.ndarray
+        Array of Hounsfield Unit values.
+    center : float
+        Window centre in HU; maps to 0.5.
+    width : float
+        Window width in HU; sets the steepness of the curve.
+    out : np.ndarray, optional
+        Array to write the result into (may be *hu_array* itself).
+
+    Returns
+    -------
+    np.ndarray
+        float32 array in (0, 1), same shape as *hu_array*.
+    """
     if width <= 0:
         raise ValueError(
             f"Window width must be > 0, got width={width}."
         )
-    windowed = np.clip(hu_array, lower, upper)
-    # Normalise to [0, 1]
-    return (windowed - lower) / (upper - lower)
+    # Each step in place on the one output buffer - no temporaries
+    out = np.subtract(hu_array, center, out=out, dtype=np.float32)
+    out *= -4.0 / width
+    # Far below the window exp overflows to inf, which correctly gives 0
+    with np.errstate(over="ignore"):
+        np.exp(out, out=out)
+    out += 1.0
+    np.reciprocal(out, out=out)
+    return out
+
+
+def hounsfield_from_dataset(ds: Dataset) -> np.ndarray:
+    """
+    Return a dataset's pixel data converted to Hounsfield Units.
+
+    Reads RescaleSlope / RescaleIntercept from the header (defaulting to 1
+    and 0).  Use this to window one slice several ways: convert once here,
+    then call :func:`apply_window` per window.
+
+    Parameters
+    ----------
+    ds : Dataset
+        Loaded pydicom Dataset.
+
+    Returns
+    -------
+    np.ndarray
+        float32 array of HU values, same shape as ``ds.pixel_array``.
+    """
+    slope = float(getattr(ds, "RescaleSlope", 1.0))
+    intercept = float(getattr(ds, "RescaleIntercept", 0.0))
+    return to_hounsfield(ds.pixel_array, slope, intercept)
 
 
 def window_from_dataset(
@@ -111,6 +209,7 @@ def window_from_dataset(
     preset: Optional[str] = None,
     center: Optional[float] = None,
     width: Optional[float] = None,
+    out: Optional[np.ndarray] = None,
 ) -> np.ndarray:
     """
     Extract pixel data from a DICOM Dataset, convert to HU, and window it.
@@ -131,18 +230,18 @@ def window_from_dataset(
         Manual window centre override.
     width : float, optional
         Manual window width override.
+    out : np.ndarray, optional
+        C-contiguous float32 array shaped like ``ds.pixel_array`` to write
+        the result into, e.g. one buffer reused across slices or presets.
+        A new array is allocated if omitted.
 
     Returns
     -------
     np.ndarray
-        Windowed image normalised to [0, 1].
+        Windowed image normalised to [0, 1], as float32, shaped like
+        ``ds.pixel_array`` — a multi-frame dataset is windowed as one
+        (frames, rows, columns) volume in a single pass.
     """
-    # Read rescale parameters with safe defaults
-    slope = float(getattr(ds, "RescaleSlope", 1.0))
-    intercept = float(getattr(ds, "RescaleIntercept", 0.0))
-
-    hu = to_hounsfield(ds.pixel_array, slope=slope, intercept=intercept)
-
     # Determine window centre/width
     if center is not None and width is not None:
         wc, ww = center, width
@@ -150,7 +249,7 @@ def window_from_dataset(
         if preset not in WINDOW_PRESETS:
             raise ValueError(
                 f"Unknown preset '{preset}'. "
-                f"Choose from: {list(WINDOW_PRESETS.keys())}"
+                f"Choose from: {list(WINDOW_PRESET_NAMES)}"
             )
         wc, ww = WINDOW_PRESETS[preset]
     else:
@@ -159,11 +258,39 @@ def window_from_dataset(
         dicom_ww = getattr(ds, "WindowWidth", None)
         if dicom_wc is not None and dicom_ww is not None:
             # WindowCenter/Width can be a MultiValue list; take the first element
-            wc = float(dicom_wc) if not hasattr(dicom_wc, "__iter__") else float(list(dicom_wc)[0])
-            ww = float(dicom_ww) if not hasattr(dicom_ww, "__iter__") else float(list(dicom_ww)[0])
+            wc = float(dicom_wc[0]) if isinstance(dicom_wc, MultiValue) else float(dicom_wc)
+            ww = float(dicom_ww[0]) if isinstance(dicom_ww, MultiValue) else float(dicom_ww)
         else:
             logger.warning("No window parameters found; defaulting to soft_tissue preset.")
             wc, ww = WINDOW_PRESETS["soft_tissue"]
 
+    if ww <= 0:
+        raise ValueError(
+            f"Window width must be > 0, got width={ww}."
+        )
+
+    # Read rescale parameters with safe defaults
+    slope = float(getattr(ds, "RescaleSlope", 1.0))
+    intercept = float(getattr(ds, "RescaleIntercept", 0.0))
+
+    # HU conversion and windowing in one pass, straight into the output -
+    # same result as apply_window(to_hounsfield(...)) without the
+    # intermediate full-size arrays.  float32 is ample for a [0, 1] display
+    # value and halves the memory every later pass (clustering, plotting)
+    # has to stream through.
     logger.debug("Applying window: centre=%.1f, width=%.1f", wc, ww)
-    return apply_window(hu, center=wc, width=ww)
+    pixels = ds.pixel_array
+    if out is None:
+        out = np.empty(pixels.shape, dtype=np.float32)
+    elif (
+        out.shape != pixels.shape
+        or out.dtype != np.float32
+        or not out.flags.c_contiguous
+    ):
+        # The compiled kernel writes through a flat view without bounds
+        # checks, so a mismatched buffer must never reach it
+        raise ValueError(
+            f"out must be a C-contiguous float32 array of shape {pixels.shape}, "
+            f"got {out.dtype} array of shape {out.shape}."
+        )
+    return window_hu(pixels, slope, intercept, wc, ww, out)
@@ -7,7 +7,7 @@ from pydicom.uid import ExplicitVRLittleEndian
 from pydicom.sequence import Sequence
 import pydicom.uid
 
-from src.anonymizer import anonymize_dataset, TAGS_TO_REMOVE, TAGS_TO_REPLACE
+from src.anonymizer import anonymize_dataset, anonymize_file, TAGS_TO_REMOVE, TAGS_TO_REPLACE
 
 
 def _make_dataset(**kwargs) -> Dataset:
@@ -99,6 +99,16 @@ class TestTagRemoval:
         private_tags = [elem for elem in ds if elem.tag.is_private]
         assert len(private_tags) == 0, "All private tags should be removed"
 
+    def test_private_tags_in_sequences_removed(self):
+        """A private tag nested in a sequence item must go too."""
+        ds = _make_dataset()
+        item = Dataset()
+        item.CodeValue = "123"
+        item.add_new([0x0009, 0x0010], "LO", "PrivateData")
+        ds.ProcedureCodeSequence = Sequence([item])
+        anonymize_dataset(ds)
+        assert not any(elem.tag.is_private for elem in ds.iterall())
+
     def test_missing_optional_tags_no_crash(self):
         """Anonymizer must not crash when optional PHI tags are absent."""
         ds = _make_dataset()
@@ -121,3 +131,29 @@ class TestTagRemoval:
         anonymize_dataset(ds)
         for tag in TAGS_TO_REMOVE:
             assert not hasattr(ds, tag), f"{tag} still present after anonymization"
+
+
+class TestAnonymizeFile:
+    def test_writes_anonymized_file(self, tmp_path):
+        src = tmp_path / "in.dcm"
+        _make_dataset().save_as(str(src))
+        out = tmp_path / "out.dcm"
+        anonymize_file(str(src), str(out))
+        assert not hasattr(pydicom.dcmread(str(out)), "PatientName")
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["in.dcm", "out.dcm"]
+
+    def test_failed_save_leaves_no_partial_file(self, tmp_path, monkeypatch):
+        src = tmp_path / "in.dcm"
+        _make_dataset().save_as(str(src))
+        out = tmp_path / "out.dcm"
+        out.write_bytes(b"previous run")
+
+        def broken_save_as(self, fp, *args, **kwargs):
+            fp.write(b"partial")
+            raise OSError("disk full")
+
+        monkeypatch.setattr(FileDataset, "save_as", broken_save_as)
+        with pytest.raises(OSError):
+            anonymize_file(str(src), str(out))
+        assert out.read_bytes() == b"previous run"
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["in.dcm", "out.dcm"]
@@ -0,0 +1,64 @@
+"""Tests for legacy/batch_processor.py."""
+
+import numpy as np
+import pydicom
+from pydicom.dataset import FileDataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian
+
+import legacy.batch_processor as batch_processor
+from legacy.batch_processor import anonymize_dataset, is_already_clean, process_one
+
+
+def _write_dicom(path: str) -> None:
+    """Write a small un-anonymized CT slice."""
+    file_meta = FileMetaDataset()
+    file_meta.MediaStorageSOPClassUID = pydicom.uid.UID("1.2.840.10008.5.1.4.1.1.2")
+    file_meta.MediaStorageSOPInstanceUID = pydicom.uid.generate_uid()
+    file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
+
+    ds = FileDataset(path, {}, file_meta=file_meta, preamble=b"\0" * 128)
+    ds.PatientName = "Doe^John"
+    ds.PatientID = "12345"
+    ds.Rows = 64
+    ds.Columns = 64
+    ds.SamplesPerPixel = 1
+    ds.PhotometricInterpretation = "MONOCHROME2"
+    ds.PixelRepresentation = 0
+    ds.BitsAllocated = 16
+    ds.BitsStored = 16
+    ds.HighBit = 15
+    ds.PixelData = np.zeros((64, 64), dtype=np.uint16).tobytes()
+    ds.save_as(path)
+
+
+class TestAnonymizeDataset:
+    def test_datasets_do_not_share_elements(self):
+        first = anonymize_dataset(pydicom.Dataset())
+        second = anonymize_dataset(pydicom.Dataset())
+        first.PatientName = "EDITED"
+        assert str(second.PatientName) == "ANONYMOUS"
+        assert is_already_clean(second)
+        assert not is_already_clean(first)
+
+
+class TestProcessOne:
+    def test_failed_write_is_redone_on_rerun(self, tmp_path, monkeypatch):
+        src = str(tmp_path / "I1")
+        _write_dicom(src)
+        out_dir = tmp_path / "out"
+        out_dir.mkdir()
+        dst = str(out_dir / "Clean_I1")
+
+        def broken_copy_rest(src_fp, dst_fp):
+            dst_fp.write(b"partial")
+            raise OSError("disk full")
+
+        with monkeypatch.context() as m:
+            m.setattr(batch_processor, "copy_rest", broken_copy_rest)
+            assert process_one(src, dst)[1] == "error"
+        assert list(out_dir.iterdir()) == []
+
+        assert process_one(src, dst)[1] == "anonymized"
+        ds = pydicom.dcmread(dst)
+        assert str(ds.PatientName) == "ANONYMOUS"
+        assert ds.pixel_array.shape == (64, 64)
@@ -0,0 +1,56 @@
+"""Tests for src/clustering.py."""
+
+import numpy as np
+import pytest
+from sklearn.metrics import silhouette_score
+
+from src.clustering import _histogram_kmeans, _silhouette_1d
+
+
+class TestHistogramKMeans:
+    def test_separated_levels_get_one_cluster_each(self):
+        rng = np.random.default_rng(0)
+        values = np.concatenate([
+            rng.normal(0.1, 0.01, 500),
+            rng.normal(0.5, 0.01, 500),
+            rng.normal(0.9, 0.01, 500),
+        ]).clip(0, 1)
+        labels = _histogram_kmeans(values, 3)
+        np.testing.assert_array_equal(labels, np.repeat([0, 1, 2], 500))
+
+    def test_labels_keep_input_shape(self):
+        values = np.linspace(0, 1, 64).reshape(8, 8)
+        labels = _histogram_kmeans(values, 2)
+        assert labels.shape == (8, 8)
+        assert set(np.unique(labels)) == {0, 1}
+
+    def test_endpoints_are_in_range(self):
+        """Values of exactly 0 and 1 must land in the first/last bin."""
+        labels = _histogram_kmeans(np.array([0.0, 0.0, 1.0, 1.0]), 2)
+        np.testing.assert_array_equal(labels, [0, 0, 1, 1])
+
+    def test_dominant_level_does_not_leave_a_cluster_empty(self):
+        """One value holding over 1/k of the mass gives duplicate seeds."""
+        values = np.concatenate([np.zeros(700), np.full(150, 0.5), np.ones(150)])
+        labels = _histogram_kmeans(values, 3)
+        np.testing.assert_array_equal(np.bincount(labels, minlength=3), [700, 150, 150])
+
+
+class TestSilhouette1D:
+    @pytest.mark.parametrize("k", [2, 3, 5])
+    def test_matches_sklearn(self, k):
+        rng = np.random.default_rng(k)
+        values = rng.random(400)
+        labels = rng.integers(0, k, 400)
+        expected = silhouette_score(values[:, None], labels)
+        assert _silhouette_1d(values, labels, k) == pytest.approx(expected, abs=1e-9)
+
+    def test_singleton_cluster_scores_zero(self):
+        values = np.array([0.0, 0.0, 0.0, 1.0])
+        labels = np.array([0, 0, 0, 1])
+        expected = silhouette_score(values[:, None], labels)
+        assert _silhouette_1d(values, labels, 2) == pytest.approx(expected)
+
+    def test_single_label_raises(self):
+        with pytest.raises(ValueError, match="Number of labels is 1"):
+            _silhouette_1d(np.array([0.1, 0.2, 0.3]), np.zeros(3, dtype=int), 2)
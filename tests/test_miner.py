@@ -0,0 +1,43 @@
+"""Tests for legacy/miner.py."""
+
+import numpy as np
+import pydicom
+from pydicom.dataset import FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian
+
+from legacy.miner import stored_pixels
+
+
+def _dataset(raw: np.ndarray, bits_stored: int, signed: bool = False) -> pydicom.Dataset:
+    """An in-memory 16-bit dataset whose PixelData is exactly ``raw``."""
+    ds = pydicom.Dataset()
+    ds.file_meta = FileMetaDataset()
+    ds.file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
+    ds.Rows, ds.Columns = raw.shape
+    ds.SamplesPerPixel = 1
+    ds.PhotometricInterpretation = "MONOCHROME2"
+    ds.PixelRepresentation = 1 if signed else 0
+    ds.BitsAllocated = 16
+    ds.BitsStored = bits_stored
+    ds.HighBit = bits_stored - 1
+    ds.PixelData = raw.astype("<u2").tobytes()
+    return ds
+
+
+class TestStoredPixels:
+    def test_full_width_is_zero_copy_view(self):
+        raw = np.arange(16, dtype=np.uint16).reshape(4, 4)
+        pixels = stored_pixels(_dataset(raw, bits_stored=16))
+        assert not pixels.flags.owndata
+        np.testing.assert_array_equal(pixels, raw.ravel())
+
+    def test_unsigned_high_bits_are_masked(self):
+        # Junk above BitsStored (overlay bits, padding) must not reach the stats
+        raw = np.full((4, 4), 0xF123, dtype=np.uint16)
+        pixels = stored_pixels(_dataset(raw, bits_stored=12))
+        assert pixels.max() == 0x123
+
+    def test_signed_short_bits_are_sign_extended(self):
+        raw = np.full((4, 4), 0x0FFF, dtype=np.uint16)
+        pixels = stored_pixels(_dataset(raw, bits_stored=12, signed=True))
+        assert pixels.max() == -1
@@ -9,7 +9,7 @@ import pytest
 from pydicom.dataset import Dataset, FileDataset
 from pydicom.uid import ExplicitVRLittleEndian
 
-from src.pipeline import mock_upload, process_folder, PipelineReport
+from src.pipeline import mock_upload, process_folder, PipelineReport, UploadResult
 
 
 def _write_dicom(path: str, patient_name: str = "Test^Patient") -> None:
@@ -39,7 +39,8 @@ class TestMockUpload:
     def test_upload_eventually_succeeds(self):
         """With failure_rate=0 the upload always succeeds on the first try."""
         result = mock_upload("test.dcm", failure_rate=0.0)
-        assert result is True
+        assert result.success is True
+        assert result.simulated_wait_s == 0.0
 
     def test_upload_fails_when_always_failing(self):
         """With failure_rate=1 all attempts fail."""
@@ -50,7 +51,24 @@ class TestMockUpload:
             base_delay=0.0,
             max_delay=0.0,
         )
-        assert result is False
+        assert result.success is False
+
+    def test_backoff_is_not_slept_by_default(self):
+        """Without simulate_latency the delays add up but nothing sleeps."""
+        import time
+
+        start = time.time()
+        result = mock_upload(
+            "test.dcm",
+            failure_rate=1.0,
+            max_attempts=3,
+            base_delay=1.0,
+            max_delay=30.0,
+        )
+        assert not result
+        # 1 + 2 + 4 seconds of backoff, plus up to 1s jitter per attempt
+        assert 7.0 <= result.simulated_wait_s <= 10.0
+        assert time.time() - start < 1.0
 
 
 class TestProcessFolder:
@@ -94,6 +112,23 @@ class TestProcessFolder:
 
         assert report.total_files == 2
 
+    def test_results_keep_file_order_with_several_workers(self, tmp_path):
+        input_dir = tmp_path / "input"
+        output_dir = tmp_path / "output"
+        input_dir.mkdir()
+
+        for i in range(6):
+            _write_dicom(str(input_dir / f"scan{i}.dcm"))
+
+        report = process_folder(
+            input_folder=str(input_dir),
+            output_folder=str(output_dir),
+            max_workers=4,
+        )
+
+        assert [r.filename for r in report.results] == [f"scan{i}.dcm" for i in range(6)]
+        assert report.processed + report.failed == 6
+
     def test_output_files_are_anonymized(self, tmp_path):
         input_dir = tmp_path / "input"
         output_dir = tmp_path / "output"
@@ -134,3 +169,21 @@ class TestPipelineCounters:
         assert report.total_files == 1
         assert report.processed == 0, "Upload-failed file must not count as successfully processed"
         assert report.failed == 1, "Upload-failed file must count in the failed counter"
+
+    def test_simulated_wait_is_recorded_separately(self, tmp_path):
+        """Skipped backoff shows up on the result, not in duration_s."""
+        from unittest.mock import patch
+
+        input_dir = tmp_path / "input"
+        input_dir.mkdir()
+        _write_dicom(str(input_dir / "scan.dcm"))
+
+        with patch("src.pipeline.mock_upload", return_value=UploadResult(True, 3.5)):
+            report = process_folder(
+                input_folder=str(input_dir),
+                output_folder=str(tmp_path / "output"),
+            )
+
+        assert report.results[0].simulated_wait_s == 3.5
+        assert report.results[0].duration_s < 3.5
+        assert "Backoff not slept" in report.summary()
@@ -9,10 +9,10 @@ import pytest
 from pydicom.dataset import FileDataset
 from pydicom.uid import ExplicitVRLittleEndian
 
-from src.scanner_qc import ScanFeatures, extract_features, run_qc
+from src.scanner_qc import DEFER_SIZE, ScanFeatures, _mapped_pixels, extract_features, run_qc
 
 
-def _write_dicom(path: str, mean_value: int = 100) -> None:
+def _write_dicom(path: str, mean_value: int = 100, size: int = 4, bits_stored: int = 16) -> None:
     """Write a minimal DICOM file with a uniform pixel array."""
     file_meta = pydicom.Dataset()
     file_meta.MediaStorageSOPClassUID = pydicom.uid.UID("1.2.840.10008.5.1.4.1.1.2")
@@ -21,15 +21,15 @@ def _write_dicom(path: str, mean_value: int = 100) -> None:
 
     ds = FileDataset(path, {}, file_meta=file_meta, preamble=b"\0" * 128)
     ds.Modality = "CT"
-    ds.Rows = 4
-    ds.Columns = 4
+    ds.Rows = size
+    ds.Columns = size
     ds.SamplesPerPixel = 1
     ds.PhotometricInterpretation = "MONOCHROME2"
     ds.PixelRepresentation = 0
     ds.BitsAllocated = 16
-    ds.BitsStored = 16
-    ds.HighBit = 15
-    pixels = np.full((4, 4), mean_value, dtype=np.uint16)
+    ds.BitsStored = bits_stored
+    ds.HighBit = bits_stored - 1
+    pixels = np.full((size, size), mean_value, dtype=np.uint16)
     ds.PixelData = pixels.tobytes()
     ds.save_as(path)
 
@@ -37,7 +37,7 @@ def _write_dicom(path: str, mean_value: int = 100) -> None:
 class TestExtractFeatures:
     def test_missing_folder_returns_empty(self, tmp_path):
         records, matrix = extract_features(str(tmp_path / "nonexistent"))
-        assert records == []
+        assert len(records) == 0
         assert matrix.shape == (0, 3)
 
     def test_extracts_three_features(self, tmp_path):
@@ -53,6 +53,39 @@ class TestExtractFeatures:
         records, matrix = extract_features(str(tmp_path))
         assert len(records) == matrix.shape[0]
 
+    def test_skips_subfolders_and_hidden_files(self, tmp_path):
+        _write_dicom(str(tmp_path / "scan.dcm"))
+        _write_dicom(str(tmp_path / ".hidden.dcm"))
+        (tmp_path / "subdir").mkdir()
+        records, matrix = extract_features(str(tmp_path))
+        assert records.filenames == ["scan.dcm"]
+
+    def test_records_are_views_of_matrix_rows(self, tmp_path):
+        for i in range(3):
+            _write_dicom(str(tmp_path / f"scan{i}.dcm"), mean_value=100 * (i + 1))
+        records, matrix = extract_features(str(tmp_path))
+        assert records.features is matrix
+        assert records.filenames == ["scan0.dcm", "scan1.dcm", "scan2.dcm"]
+        assert list(records) == [records[i] for i in range(3)]
+        assert records[2] == ScanFeatures("scan2.dcm", 300.0, 0.0, 300.0)
+
+
+class TestMappedPixels:
+    def test_uncompressed_pixels_are_mapped(self, tmp_path):
+        path = str(tmp_path / "scan.dcm")
+        _write_dicom(path, mean_value=300, size=64)
+        ds = pydicom.dcmread(path, defer_size=DEFER_SIZE)
+        mapped = _mapped_pixels(ds, path)
+        assert isinstance(mapped, np.memmap)
+        np.testing.assert_array_equal(mapped, pydicom.dcmread(path).pixel_array)
+
+    def test_partial_bit_depth_is_decoded_instead(self, tmp_path):
+        """pixel_array masks unused high bits, so a raw view would differ."""
+        path = str(tmp_path / "scan.dcm")
+        _write_dicom(path, mean_value=300, size=64, bits_stored=12)
+        ds = pydicom.dcmread(path, defer_size=DEFER_SIZE)
+        assert _mapped_pixels(ds, path) is None
+
 
 class TestRunQC:
     def test_single_file_returns_nan_silhouette(self, tmp_path):
@@ -82,3 +115,28 @@ class TestRunQC:
             _write_dicom(str(tmp_path / f"scan{i}.dcm"), mean_value=100 * (i + 1))
         records, matrix, labels, score = run_qc(str(tmp_path), n_clusters=2)
         assert len(labels) == len(records)
+
+    def test_large_fleet_uses_minibatch(self, tmp_path, monkeypatch):
+        """Above MINIBATCH_MIN_SCANS the MiniBatchKMeans branch must give valid labels."""
+        import src.scanner_qc as scanner_qc
+
+        monkeypatch.setattr(scanner_qc, "MINIBATCH_MIN_SCANS", 3)
+        for i, v in enumerate([50, 60, 1000, 1010]):
+            _write_dicom(str(tmp_path / f"scan{i}.dcm"), mean_value=v)
+        records, matrix, labels, score = run_qc(str(tmp_path), n_clusters=2)
+        assert labels[0] == labels[1] != labels[2] == labels[3]
+
+    def test_large_fleet_samples_silhouette(self, tmp_path):
+        for i, v in enumerate([50, 60, 70, 1000, 1010, 1020]):
+            _write_dicom(str(tmp_path / f"scan{i}.dcm"), mean_value=v)
+        records, matrix, labels, score = run_qc(
+            str(tmp_path), n_clusters=2, silhouette_sample_size=5
+        )
+        assert 0.9 < score <= 1.0
+
+    def test_no_sample_size_gives_exact_silhouette(self, tmp_path):
+        for i, v in enumerate([50, 60, 70, 1000, 1010, 1020]):
+            _write_dicom(str(tmp_path / f"scan{i}.dcm"), mean_value=v)
+        exact = run_qc(str(tmp_path), n_clusters=2)[3]
+        score = run_qc(str(tmp_path), n_clusters=2, silhouette_sample_size=None)[3]
+        assert score == exact
@@ -6,7 +6,14 @@ import pydicom
 from pydicom.dataset import Dataset, FileDataset
 from pydicom.uid import ExplicitVRLittleEndian
 
-from src.windowing import to_hounsfield, apply_window, window_from_dataset, WINDOW_PRESETS
+from src.windowing import (
+    to_hounsfield,
+    apply_window,
+    apply_sigmoid_window,
+    hounsfield_from_dataset,
+    window_from_dataset,
+    WINDOW_PRESETS,
+)
 
 
 def _make_ds_with_pixels(pixels: np.ndarray, slope: float = 1.0, intercept: float = 0.0) -> Dataset:
@@ -24,7 +31,7 @@ def _make_ds_with_pixels(pixels: np.ndarray, slope: float = 1.0, intercept: floa
     ds.BitsAllocated = 16
     ds.BitsStored = 16
     ds.HighBit = 15
-    ds.PixelData = pixels.astype(np.uint16).tobytes()
+    ds.PixelData = pixels.astype(np.uint16, copy=False).tobytes()
     ds.RescaleSlope = slope
     ds.RescaleIntercept = intercept
     return ds
@@ -42,6 +49,19 @@ class TestHounsfield:
         hu = to_hounsfield(pixels)
         np.testing.assert_array_equal(hu, pixels)
 
+    def test_returns_float32(self):
+        pixels = np.array([[0, 4095]], dtype=np.uint16)
+        hu = to_hounsfield(pixels, slope=1.0, intercept=-1024.0)
+        assert hu.dtype == np.float32
+        np.testing.assert_array_equal(hu, [[-1024.0, 3071.0]])
+
+    def test_writes_into_out(self):
+        pixels = np.array([[0, 4095]], dtype=np.uint16)
+        buf = np.empty((1, 2), dtype=np.float32)
+        hu = to_hounsfield(pixels, slope=2.0, intercept=-1024.0, out=buf)
+        assert hu is buf
+        np.testing.assert_array_equal(buf, [[-1024.0, 7166.0]])
+
 
 class TestWindowing:
     def test_output_in_zero_one_range(self):
@@ -65,6 +85,16 @@ class TestWindowing:
         windowed = apply_window(hu, center=40, width=80)
         assert abs(windowed[0] - 0.5) < 1e-9
 
+    def test_returns_float32(self):
+        hu = np.linspace(-1000, 2000, 100)
+        assert apply_window(hu, center=40, width=80).dtype == np.float32
+
+    def test_in_place(self):
+        hu = np.array([-2000.0, 40.0, 5000.0], dtype=np.float32)
+        windowed = apply_window(hu, center=40, width=80, out=hu)
+        assert windowed is hu
+        np.testing.assert_array_equal(hu, [0.0, 0.5, 1.0])
+
     def test_zero_width_raises(self):
         """Width of zero causes a division-by-zero; must raise ValueError."""
         hu = np.array([40.0])
@@ -78,6 +108,24 @@ class TestWindowing:
             apply_window(hu, center=40, width=-10)
 
 
+class TestSigmoidWindow:
+    def test_matches_dicom_formula(self):
+        hu = np.linspace(-1000, 2000, 301)
+        expected = 1.0 / (1.0 + np.exp(-4.0 * (hu - 40.0) / 80.0))
+        np.testing.assert_allclose(apply_sigmoid_window(hu, 40, 80), expected, atol=1e-6)
+
+    def test_center_maps_to_half_and_stays_in_range(self):
+        hu = np.array([-5000.0, 40.0, 5000.0])
+        windowed = apply_sigmoid_window(hu, center=40, width=80)
+        assert windowed.dtype == np.float32
+        assert windowed[1] == 0.5
+        assert 0.0 <= windowed[0] < 1e-6 and 1.0 - 1e-6 < windowed[2] <= 1.0
+
+    def test_zero_width_raises(self):
+        with pytest.raises(ValueError, match="Window width must be > 0"):
+            apply_sigmoid_window(np.array([40.0]), center=40, width=0)
+
+
 class TestWindowFromDataset:
     def test_preset_applied(self):
         pixels = np.zeros((4, 4), dtype=np.uint16)
@@ -107,7 +155,53 @@ class TestWindowFromDataset:
     def test_all_presets_work(self):
         pixels = np.arange(16, dtype=np.uint16).reshape(4, 4)
         ds = _make_ds_with_pixels(pixels, slope=1.0, intercept=-1024.0)
+        buf = np.empty((4, 4), dtype=np.float32)
         for preset in WINDOW_PRESETS:
-            result = window_from_dataset(ds, preset=preset)
+            result = window_from_dataset(ds, preset=preset, out=buf)
+            assert result is buf
             assert result.min() >= 0.0
             assert result.max() <= 1.0
+
+    def test_multi_valued_header_window_uses_first(self):
+        pixels = np.arange(0, 4096, 16, dtype=np.uint16).reshape(16, 16)
+        ds = _make_ds_with_pixels(pixels, slope=1.0, intercept=-1024.0)
+        ds.WindowCenter = [40, 400]
+        ds.WindowWidth = [80, 1800]
+        np.testing.assert_array_equal(
+            window_from_dataset(ds), window_from_dataset(ds, preset="brain")
+        )
+
+    @pytest.mark.parametrize("buf", [
+        np.empty((2, 2), dtype=np.float32),
+        np.empty((4, 4), dtype=np.float64),
+        np.empty((4, 8), dtype=np.float32)[:, ::2],
+    ])
+    def test_bad_out_buffer_raises(self, buf):
+        ds = _make_ds_with_pixels(np.zeros((4, 4), dtype=np.uint16))
+        with pytest.raises(ValueError, match="out must be a C-contiguous float32"):
+            window_from_dataset(ds, preset="brain", out=buf)
+
+    def test_multi_frame_volume_windowed_in_one_call(self):
+        volume = np.arange(0, 4096, 32, dtype=np.uint16).reshape(2, 8, 8)
+        ds = _make_ds_with_pixels(volume[0], slope=1.0, intercept=-1024.0)
+        ds.NumberOfFrames = 2
+        ds.PixelData = volume.tobytes()
+        result = window_from_dataset(ds, preset="bone")
+        assert result.shape == (2, 8, 8)
+        np.testing.assert_allclose(
+            result,
+            apply_window(to_hounsfield(volume, 1.0, -1024.0), *WINDOW_PRESETS["bone"]),
+            atol=1e-6,
+        )
+
+    def test_matches_hounsfield_then_window(self):
+        pixels = np.arange(0, 4096, 16, dtype=np.uint16).reshape(16, 16)
+        ds = _make_ds_with_pixels(pixels, slope=1.0, intercept=-1024.0)
+        hu = hounsfield_from_dataset(ds)
+        np.testing.assert_array_equal(hu, pixels.astype(np.float32) - 1024.0)
+        for preset, (center, width) in WINDOW_PRESETS.items():
+            np.testing.assert_allclose(
+                window_from_dataset(ds, preset=preset),
+                apply_window(hu, center, width),
+                atol=1e-6,
+            )